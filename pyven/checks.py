@@ -15,13 +15,21 @@
 # You should have received a copy of the GNU General Public License
 # along with pyven.  If not, see <http://www.gnu.org/licenses/>.
 
+from .clone import ClonePool
+from .daemon import daemonable
 from .files import Files
+from .perf import DurationHistory, testcasedurations
 from .pipify import InstallDeps
+from .plan import planning, showplan, Unit, unit
 from .projectinfo import ProjectInfo, SimpleInstallDeps
-from .util import bgcontainer, Excludes, initapt, pyversiontags, stderr
+from .store import fileparts, fingerprint, openstore
+from .trace import addtraceoption, span, tracing
+from .util import bgcontainer, containerwheelhouse, Excludes, initapt, pipinstall, pyversiontags, runjobs, stderr, ThreadPoolExecutor, wheelhouse
+from .venvs import configquota, evictifgrown
 from argparse import ArgumentParser
 from aridity.config import ConfigCtrl
 from aridity.util import NoSuchPathException, openresource
+from contextlib import contextmanager, ExitStack
 from diapyr.util import singleton
 from itertools import chain
 from lagoon import diff
@@ -29,7 +37,7 @@ from lagoon.program import partial
 from setuptools import find_packages
 from tempfile import NamedTemporaryFile
 from venvpool import initlogging, Pool
-import logging, os, shutil, subprocess, sys
+import json, logging, os, shutil, subprocess, sys, time
 
 log = logging.getLogger(__name__)
 skip = object()
@@ -47,42 +55,312 @@ def _localrepo():
     cc.loadsettings()
     return cc.node.buildbot.repo
 
-def _runcheck(variant, check, *args):
+def _runcheck(variant, check, *args, store = None, key = None):
     sys.stderr.write("%s[%s]: " % (check.__name__, variant))
     sys.stderr.flush()
-    stderr('SKIP' if check(*args) is skip else 'OK')
+    if key is not None and store.trusted and store.get(key) is not None:
+        stderr('OK (stored)')
+        return
+    with span(check.__name__, variant = variant), unit("%s[%s]" % (check.__name__, variant)):
+        result = check(*args)
+    stderr('SKIP' if result is skip else 'OK')
+    if key is not None and result is not skip:
+        store.put(key, b'OK')
+
+class NoseRunner:
+
+    requires = ['nose-cov']
+    module = 'nose'
+    command = 'nosetests'
+
+    def __init__(self, config):
+        pass
+
+    def plainargs(self, failfast):
+        return ['--exe', '-v'] + (['--stop'] if failfast else [])
+
+    def args(self, xmlpath, covnames, failfast):
+        return self.plainargs(failfast) + ['--with-xunit', '--xunit-file', xmlpath] + ([
+            '--with-cov', '--cov-report', 'term', # Missing lines are in the combined report.
+        ] + sum((['--cov', n] for n in covnames), []) if covnames else [])
+
+class PytestRunner:
+
+    requires = ['pytest', 'pytest-cov', 'pytest-xdist']
+    module = 'pytest'
+    command = 'pytest'
+
+    def __init__(self, config):
+        self.workers = str(config.test.workers)
+
+    def plainargs(self, failfast):
+        return ['-v'] + (['-x'] if failfast else [])
+
+    def args(self, xmlpath, covnames, failfast):
+        return self.plainargs(failfast) + ['-n', self.workers, '--junitxml', xmlpath] + ([
+            '--cov-report=', # Combined report instead.
+        ] + sum((['--cov', n] for n in covnames), []) if covnames else [])
+
+runners = dict(nose = NoseRunner, pytest = PytestRunner)
+coveragepolicies = 'all', 'first', 'last', 'changed', 'off'
+
+def _sysmon(pythonversion): # Much cheaper tracer, honoured by recent coverage.
+    return tuple(int(w) for w in pythonversion.split('.')[:2]) >= (3, 12)
 
 class EveryVersion:
 
-    def __init__(self, info, siblings, userepo, noseargs, docker, transient):
-        self.files = Files(info.projectdir)
+    @classmethod
+    def fromargs(cls, args, noseargs):
+        return cls(ProjectInfo.seekany('.'), args.siblings, args.repo, noseargs, args.docker, args.transient, args.fail_fast, args.perf_gate, args.profile, args.coverage)
+
+    def __init__(self, info, siblings, userepo, noseargs, docker, transient, failfast = False, perfgate = False, profile = False, coverage = None):
+        self.files = Files(info.projectdir, info.config.discovery.exclude.globs)
         self.info = info
         self.siblings = siblings
         self.userepo = userepo
         self.noseargs = noseargs
         self.docker = docker
         self.transient = transient
+        self.failfast = failfast
+        self.perfgate = perfgate
+        self.profile = profile
+        self.coveragepolicy = info.config.test.coverage if coverage is None else coverage
+        if self.coveragepolicy not in coveragepolicies:
+            raise Exception("Unknown coverage policy: %s" % self.coveragepolicy)
+        self.runner = runners[info.config.test.runner](info.config)
+        self.heldvenvs = {}
+        self.store = openstore(info.config)
+
+    @contextmanager
+    def _runnerinstalldeps(self):
+        with InstallDeps(self.info, self.siblings, _localrepo() if self.userepo else None) as installdeps:
+            installdeps.add(*self.runner.requires + list(self.info.config.test.requires))
+            yield installdeps
+
+    def _warm(self, units):
+        def warm(label, pyversion, installdeps):
+            start = time.time()
+            with unit("venv %s[%s]" % (label, pyversion)), Pool(pyversion).readonly(installdeps):
+                pass
+            return time.time() - start
+        with ThreadPoolExecutor() as executor:
+            futures = [[label, pyversion, executor.submit(warm, label, pyversion, deps)] for label, pyversion, deps in units]
+            for label, pyversion, future in futures:
+                log.info("Prewarmed %s[%s] venv in %.1fs", label, pyversion, future.result())
+
+    def _coveragewarmup(self): # Combining always happens on the host.
+        return [] if 'off' == self.coveragepolicy else [['coverage', next(iter(self.info.config.pyversions)), SimpleInstallDeps(['coverage'])]]
+
+    def prewarm(self):
+        if self.docker or self.transient:
+            self._warm(self._coveragewarmup())
+            return
+        pyversions = list(self.info.config.pyversions)
+        with self._runnerinstalldeps() as installdeps:
+            units = [['runner', v, installdeps] for v in pyversions]
+            if self._flakespaths():
+                units.extend(['pyflakes', v, SimpleInstallDeps(['pyflakes'])] for v in pyversions)
+            self._warm(units + self._coveragewarmup())
+
+    def allchecks(self, pipeline = False):
+        staticchecks = self.licheck, self.nlcheck, self.execcheck, self.divcheck, self.pyflakes
+        if not pipeline:
+            for check in staticchecks + (self.nose, self.coverage, self.readme):
+                check()
+            self._markgreen()
+            return
+        with ExitStack() as stack, ThreadPoolExecutor(1) as executor:
+            def provision():
+                installdeps = stack.enter_context(self._runnerinstalldeps())
+                if not (self.docker or self.transient):
+                    self._warm([['runner', v, installdeps] for v in self.info.config.pyversions])
+                return installdeps
+            future = executor.submit(provision)
+            for check in staticchecks:
+                check()
+            self.nose(installdeps = future.result())
+        self.coverage()
+        self.readme()
+        self._markgreen()
+
+    def units(self, pipeline = False, prewarm = False, jobs = 1):
+        pyversions = list(self.info.config.pyversions)
+        units = [Unit("%s[*]" % n) for n in ['licheck', 'nlcheck', 'execcheck']]
+        units.extend(Unit("%s[%s]" % (n, v)) for n in ['divcheck', 'pyflakes'] for v in pyversions)
+        venvs = []
+        if not (self.docker or self.transient) and (pipeline or prewarm): # Otherwise venvs are part of the test units.
+            labels = ['runner', 'pyflakes'] if prewarm else ['runner']
+            venvs.extend((l, v) for v in pyversions for l in labels)
+        if prewarm:
+            venvs.extend((l, v) for l, v, _ in self._coveragewarmup())
+        units.extend(Unit("venv %s[%s]" % (l, v), -1 if prewarm else 0, 1 + i) for i, (l, v) in enumerate(venvs))
+        parallel = 1 != jobs and not (self.docker or self.failfast)
+        for i, v in enumerate(pyversions):
+            xmlpath = os.path.join(self._reportsdir(v), 'nosetests.xml')
+            fallback = sum(testcasedurations(xmlpath).values()) if os.path.exists(xmlpath) else None
+            note = "container python:%s" % pyversiontags[v][0] if self.docker else 'transient venv' if self.transient else ''
+            units.append(Unit("nose[%s]" % v, 1, i if parallel else 0, fallback, note))
+        units.extend(Unit("%s[*]" % n, 2) for n in ['coverage', 'readme'])
+        return units
+
+    def _covnames(self, pyversion):
+        pyversions = list(self.info.config.pyversions)
+        policy = self.coveragepolicy
+        if 'off' == policy or 'first' == policy and pyversion != pyversions[0] or 'last' == policy and pyversion != pyversions[-1]:
+            return []
+        if 'changed' == policy:
+            t = self._changedsincegreen()
+            if t is not None:
+                return sorted({p[:-len('.py')].replace('/', '.') for p in t[1] if p.endswith('.py') and not os.path.basename(p).startswith('test_')})
+        return list(chain(find_packages(self.info.projectdir), self.info.py_modules()))
+
+    def _changedsincegreen(self):
+        from .diffcov import changedlines
+        try:
+            with open(self._greenpath()) as f:
+                commit = json.load(f)['commit']
+        except (IOError, ValueError):
+            return
+        return commit, changedlines(self.info.projectdir, commit)
+
+    def historypath(self):
+        return os.path.join(self.info.projectdir, 'var', 'phases.json')
+
+    def _greenpath(self):
+        return os.path.join(self.info.projectdir, 'var', 'green.json')
 
-    def allchecks(self):
-        for check in self.licheck, self.nlcheck, self.execcheck, self.divcheck, self.pyflakes, self.nose, self.readme:
-            check()
+    def _markgreen(self):
+        try:
+            commit = subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd = self.info.projectdir, stderr = subprocess.DEVNULL).decode().strip()
+        except subprocess.CalledProcessError:
+            return
+        with open(self._greenpath(), 'w') as f:
+            json.dump(dict(commit = commit), f)
+
+    def coverage(self):
+        with unit('coverage[*]'):
+            self._coverage()
+
+    def _coverage(self):
+        from .diffcov import diffcoverage
+        pyversions = list(self.info.config.pyversions)
+        datapaths = [[v, p] for v in pyversions for p in [os.path.join(self._reportsdir(v), 'coverage')] if os.path.exists(p)]
+        if not datapaths:
+            return
+        combineddir = os.path.join(self.info.projectdir, 'var', 'combined')
+        if os.path.exists(combineddir):
+            shutil.rmtree(combineddir)
+        os.makedirs(combineddir)
+        for pyversion, path in datapaths:
+            shutil.copy2(path, os.path.join(combineddir, ".coverage.%s" % pyversion)) # Combine consumes its inputs.
+        rcpath = os.path.join(combineddir, 'coveragerc')
+        with open(rcpath, 'w') as f:
+            f.write("[paths]\nsource =\n    %s\n    %s\n" % (os.path.abspath(self.info.projectdir), Container.workdir)) # Docker runs see the project at workdir.
+        reportpath = os.path.join(combineddir, 'coverage.json')
+        with ClonePool(pyversions[0]).readonly(SimpleInstallDeps(['coverage'])) as venv:
+            run = lambda *args: venv.run('call', [], 'coverage', list(args) + ['--rcfile', rcpath], cwd = combineddir)
+            run('combine')
+            print("Combined coverage [%s]:" % ','.join(str(v) for v, _ in datapaths))
+            sys.stdout.flush()
+            run('report', '-m')
+            run('json', '-o', reportpath)
+        t = self._changedsincegreen()
+        if t is None or not os.path.exists(reportpath):
+            return
+        commit, changed = t
+        summary = diffcoverage(os.path.abspath(self.info.projectdir), reportpath, changed)
+        if summary:
+            print("Diff coverage since %s:" % commit[:12])
+            for path, (covered, statements, missing) in summary.items():
+                print("%6.1f%% %s%s" % (100 * covered / statements, path, " missing %s" % ','.join(map(str, missing)) if missing else ''))
+            covered, statements = (sum(t[i] for t in summary.values()) for i in range(2))
+            print("%6.1f%% TOTAL" % (100 * covered / statements))
+
+    @contextmanager
+    def _venv(self, key, pyversion, installdeps):
+        venv = self.heldvenvs.get((key, pyversion))
+        if venv is None:
+            with ClonePool(pyversion).readonlyortransient[self.transient](installdeps) as venv:
+                yield venv
+        else:
+            yield venv
+
+    def watch(self, quiet = .3):
+        from .watch import debounced, ImportGraph, watcher, watchtree
+        staticchecks = self.licheck, self.nlcheck, self.execcheck, self.divcheck, self.pyflakes
+        with self._runnerinstalldeps() as installdeps, ExitStack() as stack:
+            for pyversion in self.info.config.pyversions: # Keep these for the whole session.
+                self.heldvenvs['runner', pyversion] = stack.enter_context(ClonePool(pyversion).readonlyortransient[self.transient](installdeps))
+                self.heldvenvs['pyflakes', pyversion] = stack.enter_context(ClonePool(pyversion).readonlyortransient[self.transient](SimpleInstallDeps(['pyflakes'])))
+            files = self.files
+            graph = ImportGraph(files.root)
+            w = watcher()
+            stack.callback(w.close)
+            watched = set()
+            excludes = Excludes(['var/**'] + list(self.info.config.discovery.exclude.globs)) # Outputs must not retrigger.
+            def excluded(dirpath):
+                return excludes.excludesall(os.path.relpath(dirpath, files.root))
+            watchtree(w, files.root, watched, excluded)
+            def run(srcpaths, testpaths):
+                start = time.time()
+                self.files = files.subset(srcpaths, testpaths)
+                try:
+                    for check in staticchecks:
+                        check()
+                    if testpaths:
+                        self.nose(installdeps = installdeps)
+                    outcome = 'OK'
+                except Exception as e:
+                    outcome = "FAIL %s" % type(e).__name__
+                finally:
+                    self.files = files
+                stderr("[%s] %s: %s changed, %s test modules in %.1fs" % (time.strftime('%H:%M:%S'), outcome, len(srcpaths), len(testpaths), time.time() - start))
+            run(set(files.allsrcpaths), files.testpaths(os.path.join(self._reportsdir(next(iter(self.info.config.pyversions))), 'nosetests.xml')))
+            while True:
+                changed = debounced(w, quiet)
+                oldpaths = set(files.allsrcpaths)
+                rediscover = False
+                for path in sorted(changed):
+                    if os.path.isdir(path):
+                        if path not in watched and not excluded(path):
+                            watchtree(w, path, watched, excluded)
+                            rediscover = True
+                    elif not os.path.exists(path):
+                        watched.discard(path)
+                        rediscover = rediscover or path in oldpaths
+                    elif path not in oldpaths and Files.issrcname(os.path.basename(path)):
+                        rediscover = True
+                if rediscover:
+                    files = Files(self.info.projectdir, self.info.config.discovery.exclude.globs)
+                    changed |= set(files.allsrcpaths) - oldpaths # Including any created along with a new directory.
+                changed &= set(files.allsrcpaths)
+                if changed:
+                    run(changed, graph.affectedtests(files.pypaths, changed))
+
+    def _checkkey(self, check, variant, paths, *toolversions):
+        modulepath = sys.modules[check.__module__].__file__
+        aridpath = os.path.join(self.info.projectdir, ProjectInfo.projectaridname)
+        paths = set(paths) | ({aridpath} if os.path.exists(aridpath) else set())
+        return fingerprint(check.__name__, variant, *chain(toolversions, fileparts(os.path.dirname(modulepath), [modulepath]), fileparts(self.info.projectdir, paths)))
 
     def licheck(self):
         from .licheck import licheck
-        def g():
-            excludes = Excludes(self.info.config.licheck.exclude.globs)
-            for path in self.files.allsrcpaths:
-                if os.path.relpath(path, self.files.root) not in excludes:
-                    yield path
-        _runcheck('*', licheck, self.info, list(g()))
+        config = self.info.config
+        paths = self.files.excluding(config.licheck.exclude.globs, self.files.allsrcpaths)
+        key = None
+        if config.licheck.enabled: # Otherwise it doesn't run, so there's nothing to store.
+            inputs = [os.path.join(self.info.projectdir, 'COPYING')] + ([self.info.mitpath()] if 'MIT' in config.licenses else [])
+            gplparts = [list(config.years), config.author, config.name] if 'GPL' in config.licenses else []
+            key = self._checkkey(licheck, '*', paths + [p for p in inputs if os.path.exists(p)], list(config.licenses), *gplparts)
+        _runcheck('*', licheck, self.info, paths, store = self.store, key = key)
 
     def nlcheck(self):
         from .nlcheck import nlcheck
-        _runcheck('*', nlcheck, self.files.allsrcpaths)
+        _runcheck('*', nlcheck, self.files.allsrcpaths, store = self.store, key = self._checkkey(nlcheck, '*', self.files.allsrcpaths))
 
     def execcheck(self):
         from .execcheck import execcheck
-        _runcheck('*', execcheck, self.files.pypaths)
+        _runcheck('*', execcheck, self.files.pypaths, store = self.store, key = self._checkkey(execcheck, '*', self.files.pypaths))
 
     def divcheck(self):
         from . import divcheck
@@ -94,52 +372,134 @@ class EveryVersion:
         for pyversion in self.info.config.pyversions:
             _runcheck(pyversion, divcheck)
 
+    def _flakespaths(self):
+        return self.files.excluding(self.info.config.flakes.exclude.globs, self.files.pypaths)
+
     def pyflakes(self):
-        paths = [path for excludes in [Excludes(self.info.config.flakes.exclude.globs)]
-                for path in self.files.pypaths if os.path.relpath(path, self.files.root) not in excludes]
+        paths = self._flakespaths()
         def pyflakes():
             if paths:
-                with Pool(pyversion).readonlyortransient[self.transient](SimpleInstallDeps(['pyflakes'])) as venv:
-                    venv.run('check_call', [], 'pyflakes', paths)
+                venv.run('check_call', [], 'pyflakes', paths)
         for pyversion in self.info.config.pyversions:
-            _runcheck(pyversion, pyflakes)
+            with ExitStack() as stack:
+                key = None
+                if paths:
+                    venv = stack.enter_context(self._venv('pyflakes', pyversion, SimpleInstallDeps(['pyflakes'])))
+                    versions = subprocess.check_output([venv.programpath('python'), '-c', 'import pyflakes, sys; print(pyflakes.__version__, sys.version)'])
+                    key = self._checkkey(pyflakes, pyversion, paths, versions)
+                _runcheck(pyversion, pyflakes, store = self.store, key = key)
 
-    def nose(self):
+    def nose(self, jobs = 1, installdeps = None):
+        if installdeps is None:
+            with self._runnerinstalldeps() as installdeps:
+                return self.nose(jobs, installdeps)
+        pyversions = list(self.info.config.pyversions)
+        if 1 == jobs or 1 == len(pyversions) or self.docker or self.failfast: # Containers share the project mount, so no isolation.
+            for pyversion in pyversions:
+                self._timednose(installdeps, pyversion, None)
+        else:
+            runjobs(jobs, [[pyversion, os.path.join(self._reportsdir(pyversion), 'nose.log'), lambda logfile, pyversion = pyversion: self._timednose(installdeps, pyversion, logfile)] for pyversion in pyversions])
+
+    def _timednose(self, installdeps, pyversion, logfile):
+        with unit("nose[%s]" % pyversion):
+            self._nose(installdeps, pyversion, logfile)
+
+    def _reportsdir(self, pyversion):
+        return os.path.abspath(os.path.join(self.info.projectdir, 'var', str(pyversion)))
+
+    def _nose(self, installdeps, pyversion, logfile):
         upstream_devel_packages = list(self.info.config.upstream.devel.packages)
-        with InstallDeps(self.info, self.siblings, _localrepo() if self.userepo else None) as installdeps:
-            installdeps.add('nose-cov', *self.info.config.test.requires)
-            for pyversion in self.info.config.pyversions:
-                reportsdir = os.path.join(self.info.projectdir, 'var', str(pyversion))
-                os.makedirs(reportsdir, exist_ok = True)
-                xmlpath = os.path.join(reportsdir, 'nosetests.xml')
-                if self.docker:
-                    coveragepath = os.path.join(self.info.projectdir, '.coverage')
-                    with bgcontainer('-v', "{0}:{0}".format('/var/run/docker.sock'), '--network', 'host', '-v', "%s:%s" % (os.path.abspath(self.info.projectdir), Container.workdir), "python:%s" % pyversiontags[pyversion][0]) as container:
-                        container = Container(container)
-                        container.inituser()
-                        if upstream_devel_packages:
-                            container.initapt()
-                        for command in ['apt-get', 'update'], ['apt-get', 'install', '-y', 'sudo'] + upstream_devel_packages:
-                            container.call(command, check = True, root = True)
-                        installdeps.invoke(container)
-                        cpath = lambda p: os.path.relpath(p, self.info.projectdir).replace(os.sep, '/')
-                        status = container.call([
-                            'nosetests', '--exe', '-v',
-                            '--with-xunit', '--xunit-file', cpath(xmlpath),
-                            '--with-cov', '--cov-report', 'term-missing',
-                        ] + sum((['--cov', p] for p in chain(find_packages(self.info.projectdir), self.info.py_modules())), []) + [cpath(p) for p in self.files.testpaths(xmlpath)] + self.noseargs)
+        reportsdir = self._reportsdir(pyversion)
+        os.makedirs(reportsdir, exist_ok = True)
+        xmlpath = os.path.join(reportsdir, 'nosetests.xml')
+        covnames = self._covnames(pyversion)
+        if os.path.exists(os.path.join(reportsdir, 'coverage')):
+            os.remove(os.path.join(reportsdir, 'coverage')) # Don't combine stale data.
+        start = time.time()
+        if self.docker:
+            coveragepath = os.path.join(self.info.projectdir, '.coverage')
+            with bgcontainer('-v', "{0}:{0}".format('/var/run/docker.sock'), '--network', 'host', '-v', "%s:%s" % (os.path.abspath(self.info.projectdir), Container.workdir), '-v', "{0}:{0}".format(installdeps.workspace), "python:%s" % pyversiontags[pyversion][0], shared = True) as container:
+                container = Container(container, pyversiontags[pyversion][0])
+                container.inituser()
+                if upstream_devel_packages:
+                    container.initapt()
+                for command in ['apt-get', 'update'], ['apt-get', 'install', '-y', 'sudo'] + upstream_devel_packages:
+                    container.call(command, check = True, root = True)
+                installdeps.invoke(container)
+                cpath = lambda p: os.path.relpath(p, self.info.projectdir).replace(os.sep, '/')
+                envprefix = ['env', 'COVERAGE_CORE=sysmon'] if covnames and _sysmon(pyversiontags[pyversion][0]) else [] # Survives sudo.
+                if self.profile:
+                    status = self._profilemodules(pyversion, reportsdir, xmlpath, cpath, lambda profiledir, args: container.call(['python', cpath(os.path.join(profiledir, 'profilemodule.py'))] + args))
+                else:
+                    status = container.call(envprefix + [self.runner.command] + self.runner.args(cpath(xmlpath), covnames, self.failfast) + [cpath(p) for p in self.files.testpaths(xmlpath)] + self.noseargs)
+        else:
+            env = {}
+            if logfile is None:
+                coveragepath = '.coverage'
+                kwargs = {}
+            else: # Same cwd as serial, but .coverage mustn't collide with other pyversions.
+                coveragepath = os.path.abspath(os.path.join(reportsdir, '.coverage'))
+                env['COVERAGE_FILE'] = coveragepath
+                kwargs = dict(stdout = logfile, stderr = subprocess.STDOUT)
+            localreqs = [os.path.abspath(p) for p in installdeps.localreqs]
+            with self._venv('runner', pyversion, installdeps) as venv:
+                if covnames and _sysmon(os.path.basename(os.path.dirname(venv.site_packages))[len('python'):]):
+                    env['COVERAGE_CORE'] = 'sysmon'
+                if env:
+                    kwargs['env'] = dict(os.environ, **env)
+                if self.profile:
+                    status = self._profilemodules(pyversion, reportsdir, xmlpath, os.path.abspath, lambda profiledir, args: venv.run('call', localreqs + [profiledir], 'profilemodule', args, **kwargs))
                 else:
-                    coveragepath = '.coverage'
-                    with Pool(pyversion).readonlyortransient[self.transient](installdeps) as venv:
-                        status = venv.run('call', installdeps.localreqs, 'nose', [
-                            '--exe', '-v',
-                            '--with-xunit', '--xunit-file', xmlpath,
-                            '--with-cov', '--cov-report', 'term-missing',
-                        ] + sum((['--cov', p] for p in chain(find_packages(self.info.projectdir), self.info.py_modules())), []) + self.files.testpaths(xmlpath) + self.noseargs)
-                if os.path.exists(coveragepath):
-                    shutil.copy2(coveragepath, os.path.join(reportsdir, 'coverage')) # Replace whatever the status, as if we configured the location.
-                    os.remove(coveragepath) # Can't simply use rename cross-device in release case.
-                assert not status
+                    status = venv.run('call', localreqs, self.runner.module, self.runner.args(xmlpath, covnames, self.failfast) + [os.path.abspath(p) for p in self.files.testpaths(xmlpath)] + self.noseargs, **kwargs)
+        if os.path.exists(coveragepath):
+            shutil.copy2(coveragepath, os.path.join(reportsdir, 'coverage')) # Replace whatever the status, as if we configured the location.
+            os.remove(coveragepath) # Can't simply use rename cross-device in release case.
+        if os.path.exists(xmlpath) and os.path.getmtime(xmlpath) >= start:
+            self.files.recordhistory(xmlpath)
+            if not status:
+                self._perfcheck(pyversion, xmlpath, os.path.join(reportsdir, 'durations.tsv'))
+        assert not status
+
+    def _profilemodules(self, pyversion, reportsdir, xmlpath, cpath, run):
+        from . import profilemodule
+        profiledir = os.path.join(reportsdir, 'profile')
+        if os.path.exists(profiledir):
+            shutil.rmtree(profiledir)
+        os.makedirs(profiledir)
+        shutil.copy2(profilemodule.__file__, profiledir)
+        status = 0
+        for path in self.files.testpaths(xmlpath): # One process per module, without coverage as it would dominate.
+            stem = os.path.join(profiledir, path[len(self.files.root + os.sep):-len('.py')].replace(os.sep, '.'))
+            status = run(profiledir, [cpath(stem + '.pstats'), cpath(stem + '.json'), self.runner.module] + self.runner.plainargs(self.failfast) + [cpath(path)] + self.noseargs) or status
+            if status and self.failfast:
+                break
+        self._profilereport(pyversion, profiledir)
+        return status
+
+    def _profilereport(self, pyversion, profiledir):
+        import pstats
+        names = sorted(n[:-len('.json')] for n in os.listdir(profiledir) if n.endswith('.json'))
+        statspaths = [os.path.join(profiledir, n + '.pstats') for n in names]
+        if statspaths:
+            print("Hottest functions [%s]:" % pyversion)
+            pstats.Stats(*statspaths, stream = sys.stdout).sort_stats('tottime').print_stats(20)
+        def maxrsskib(name):
+            with open(os.path.join(profiledir, name + '.json')) as f:
+                return json.load(f)['maxrsskib']
+        print("Peak RSS by module [%s]:" % pyversion)
+        for kib, name in sorted(((maxrsskib(n), n) for n in names), reverse = True)[:10]:
+            print("%10.1f MiB %s" % (kib / 1024, name))
+
+    def _perfcheck(self, pyversion, xmlpath, historypath):
+        perf = self.info.config.perf
+        durations = testcasedurations(xmlpath)
+        history = DurationHistory(historypath, perf.window)
+        regressions = list(history.regressions(durations, float(perf.threshold), float(perf.mindelta)))
+        for testid, baseline, seconds in regressions:
+            log.warning("Slower [%s] %s: %.3fs against baseline %.3fs", pyversion, testid, seconds, baseline)
+        history.record(durations)
+        if regressions and self.perfgate:
+            raise Exception("Performance regressions: %s" % len(regressions))
 
     def readme(self):
         def first(scope, resolvable):
@@ -173,11 +533,12 @@ class Container:
 
     workdir = '/io'
 
-    def __init__(self, container):
+    def __init__(self, container, pythontag):
         from lagoon import id
         self.uid = int(id._u())
         self.gid = int(id._g())
         self.container = container
+        self.pythontag = pythontag
 
     def inituser(self):
         from lagoon import docker
@@ -189,21 +550,68 @@ class Container:
         from lagoon import docker
         initapt(docker[partial]('exec', self.container, stdout = None))
 
+    def _volatilewheels(self, projectdir): # Once per commit and python.
+        from lagoon import docker, git
+        key = "%s-%s-py%s" % (os.path.basename(projectdir), git.rev_parse.HEAD(cwd = projectdir).rstrip(), self.pythontag)
+        hostdir = os.path.join(wheelhouse, 'volatile', key)
+        if not os.path.isdir(hostdir):
+            log.info("Prebuild volatile project: %s", key)
+            partdir = hostdir + '.part'
+            if os.path.exists(partdir):
+                shutil.rmtree(partdir)
+            docker('exec', '-u', "%s:%s" % (self.uid, self.gid), self.container, 'pip', 'wheel', '--no-deps', '-w', "%s/volatile/%s.part" % (containerwheelhouse, key), projectdir, stdout = None)
+            os.rename(partdir, hostdir)
+        return ["%s/volatile/%s/%s" % (containerwheelhouse, key, name) for name in sorted(os.listdir(hostdir))]
+
     def install(self, args):
-        from lagoon import docker
         if args:
-            docker('exec', '-w', self.workdir, self.container, 'pip', 'install', *args, stdout = None)
+            pipinstall(self.container, [r for arg in args for r in (self._volatilewheels(arg) if os.path.isdir(arg) else [arg])], ('-w', self.workdir))
 
     def call(self, args, check = False, root = False):
         from lagoon import docker
         return docker('exec', '-w', self.workdir, self.container, *([] if root else ['sudo', '-u', 'pyvenuser']) + args, stdout = None, check = check)
 
-def main():
-    initlogging()
-    parser = ArgumentParser()
+def initparser(parser):
     parser.add_argument('--docker', action = 'store_true')
     parser.add_argument('--repo', type = yesno, default = True)
     parser.add_argument('--siblings', type = yesno, default = True)
     parser.add_argument('--transient', action = 'store_true')
+    parser.add_argument('--fail-fast', action = 'store_true', help = 'stop at the first failing test, skipping remaining modules and pyversions')
+    parser.add_argument('--perf-gate', action = 'store_true', help = 'fail if any test is significantly slower than its moving baseline')
+    parser.add_argument('--profile', action = 'store_true', help = 'run each test module under cProfile and record its peak RSS')
+    parser.add_argument('--coverage', choices = coveragepolicies, help = 'measure on all pyversions, first or last only, only changed modules, or off; default from config')
+
+@daemonable
+def main():
+    initlogging()
+    parser = ArgumentParser()
+    initparser(parser)
+    parser.add_argument('--prewarm', action = 'store_true', help = 'create all needed venvs concurrently before running checks')
+    parser.add_argument('--pipeline', action = 'store_true', help = 'resolve deps and provision nose venvs in the background during static checks')
+    parser.add_argument('--plan', action = 'store_true', help = 'list the units this run would perform with estimated durations, then exit')
+    parser.add_argument('--watch', action = 'store_true', help = 'keep venvs and rerun checks and affected tests whenever files change')
+    addtraceoption(parser)
     args, noseargs = parser.parse_known_args()
-    EveryVersion(ProjectInfo.seekany('.'), args.siblings, args.repo, noseargs, args.docker, args.transient).allchecks()
+    if args.watch and (args.docker or args.profile):
+        parser.error('--watch is not supported with --docker or --profile')
+    with tracing(args.trace):
+        everyversion = EveryVersion.fromargs(args, noseargs)
+        units = everyversion.units(args.pipeline, args.prewarm)
+        if args.plan:
+            showplan(everyversion.historypath(), units)
+            return
+        try:
+            with ExitStack() as stack:
+                if not args.watch: # Partial runs would skew the history.
+                    stack.enter_context(planning(everyversion.historypath(), units))
+                if args.prewarm:
+                    everyversion.prewarm()
+                if args.watch:
+                    try:
+                        everyversion.watch()
+                    except KeyboardInterrupt:
+                        pass
+                else:
+                    everyversion.allchecks(args.pipeline)
+        finally:
+            evictifgrown(configquota(everyversion.info))
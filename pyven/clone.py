@@ -0,0 +1,84 @@
+# Copyright 2013, 2014, 2015, 2016, 2017, 2020, 2022 Andrzej Cichocki
+
+# This file is part of pyven.
+#
+# pyven is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyven is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyven.  If not, see <http://www.gnu.org/licenses/>.
+
+from .projectinfo import SimpleInstallDeps
+from .util import cachedir
+from contextlib import contextmanager
+from tempfile import mkdtemp
+from venvpool import Pool, Venv
+import hashlib, logging, os, shutil, subprocess
+
+log = logging.getLogger(__name__)
+clonesdir = os.path.join(cachedir, 'clones') # Same filesystem as templates, so reflinks work.
+templatesdir = os.path.join(cachedir, 'templates')
+
+def clonetree(srcpath, dstpath):
+    with open(os.devnull, 'w') as devnull:
+        for args in ['--reflink=always'], []: # Not hard links, writes to the clone must not reach the template.
+            if not subprocess.call(['cp', '-a'] + args + [srcpath, dstpath], stderr = devnull):
+                log.debug("Cloned %s with: %s", srcpath, ' '.join(args) or 'plain copy')
+                return
+            if os.path.exists(dstpath):
+                shutil.rmtree(dstpath)
+    raise Exception("Failed to clone: %s" % srcpath)
+
+def _relocate(srcpath, dstpath):
+    shutil.rmtree(os.path.join(dstpath, 'readlocks'), ignore_errors = True) # Not ours.
+    old = srcpath.encode()
+    new = dstpath.encode()
+    bindir = os.path.join(dstpath, 'bin')
+    for name in os.listdir(bindir):
+        path = os.path.join(bindir, name)
+        if os.path.islink(path) or not os.path.isfile(path):
+            continue
+        with open(path, 'rb') as f:
+            data = f.read()
+        if old in data:
+            mode = os.stat(path).st_mode
+            os.remove(path) # Break any link to the template.
+            with open(path, 'wb') as f:
+                f.write(data.replace(old, new))
+            os.chmod(path, mode)
+
+class TemplatePool(Pool):
+
+    @property
+    def versiondir(self):
+        return os.path.join(templatesdir, str(self.pyversion), self.fingerprint)
+
+    def __init__(self, pyversion, reqs):
+        Pool.__init__(self, pyversion)
+        self.fingerprint = hashlib.sha256('\n'.join(sorted(reqs)).encode()).hexdigest()[:16] # Every venv here has exactly these.
+
+class ClonePool(Pool):
+
+    @contextmanager
+    def _transient(self, installdeps):
+        os.makedirs(clonesdir, exist_ok = True)
+        holder = mkdtemp(dir = clonesdir)
+        try:
+            clonepath = os.path.join(holder, 'venv')
+            reqs = installdeps.templatereqs
+            with TemplatePool(self.pyversion, reqs).readonly(SimpleInstallDeps(reqs)) as template:
+                srcpath = os.path.abspath(template.venvpath)
+                clonetree(srcpath, clonepath)
+            _relocate(srcpath, clonepath)
+            venv = Venv(clonepath)
+            installdeps.invoke(venv) # Only the delta should actually install.
+            yield venv
+        finally:
+            shutil.rmtree(holder)
@@ -0,0 +1,268 @@
+# Copyright 2013, 2014, 2015, 2016, 2017, 2020, 2022 Andrzej Cichocki
+
+# This file is part of pyven.
+#
+# pyven is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyven is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyven.  If not, see <http://www.gnu.org/licenses/>.
+
+'Serve pyven commands from a warm resident process, for faster tests/pipify/launch/tasks/minreqs.'
+from .util import cachedir
+from array import array
+from functools import wraps
+import json, logging, os, signal, socket, struct, sys
+
+log = logging.getLogger(__name__)
+disableenv = 'PYVEN_NODAEMON'
+header = struct.Struct('!I')
+served = False
+socketpath = os.path.join(os.environ.get('XDG_RUNTIME_DIR') or cachedir, 'pyven.sock')
+stdfds = 0, 1, 2
+warmmodules = 'pyven.checks', 'pyven.launch', 'pyven.minreqs', 'pyven.pipify', 'pyven.tasks'
+
+def _recvexactly(sock, n):
+    data = b''
+    while len(data) < n:
+        chunk = sock.recv(n - len(data))
+        if not chunk:
+            raise EOFError
+        data += chunk
+    return data
+
+def _delegate(modulename):
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(socketpath)
+    except (FileNotFoundError, ConnectionRefusedError):
+        sock.close()
+        return
+    with sock:
+        body = json.dumps(dict(module = modulename, argv = sys.argv, cwd = os.getcwd(), env = dict(os.environ))).encode()
+        sock.sendmsg([header.pack(len(body))], [(socket.SOL_SOCKET, socket.SCM_RIGHTS, array('i', stdfds))])
+        sock.sendall(body)
+        try:
+            return header.unpack(_recvexactly(sock, header.size))[0]
+        except KeyboardInterrupt: # Closing the connection interrupts the command.
+            return 128 + signal.SIGINT
+
+def daemonable(main):
+    @wraps(main)
+    def wrapper():
+        if not served and not os.environ.get(disableenv):
+            modulename = main.__module__
+            if '__main__' == modulename:
+                spec = sys.modules['__main__'].__spec__
+                modulename = None if spec is None else spec.name
+            if modulename is not None:
+                status = _delegate(modulename)
+                if status is not None:
+                    sys.exit(status)
+        main()
+    return wrapper
+
+class RelpathsCache:
+
+    def __init__(self):
+        self.roots = {}
+
+    def get(self, relpaths, root, suffixes, prefixes, excludeglobs):
+        from .watch import watcher, watchtree
+        entry = self.roots.get(root)
+        if entry is None:
+            self.roots[root] = entry = watcher(), set(), {}, set()
+            watchtree(entry[0], root, entry[1])
+        _, _, results, known = entry
+        key = tuple(suffixes), tuple(prefixes), tuple(excludeglobs)
+        paths = results.get(key)
+        if paths is None:
+            results[key] = paths = list(relpaths(root, suffixes, prefixes, excludeglobs))
+            known.update(os.path.join(root, p) for p in paths)
+        return paths
+
+    def refresh(self):
+        from .watch import watchtree
+        for root, (w, watched, results, known) in self.roots.items():
+            stale = False
+            for path in w.changes(0):
+                if os.path.isdir(path):
+                    if path not in watched: # Files may already be in there.
+                        watchtree(w, path, watched)
+                        stale = True
+                elif path in known:
+                    stale = stale or not os.path.exists(path) # Edits don't change the listing.
+                else:
+                    watched.discard(path)
+                    name = os.path.basename(path)
+                    stale = stale or any(name.endswith(s) for (suffixes, _, _) in results for s in suffixes) or any(name.startswith(p) for (_, prefixes, _) in results for p in prefixes)
+            if stale:
+                log.debug("Invalidate file index: %s", root)
+                results.clear()
+                known.clear()
+
+def _exitstatus(status):
+    return os.WEXITSTATUS(status) if os.WIFEXITED(status) else 128 + os.WTERMSIG(status)
+
+class Daemon:
+
+    def __init__(self):
+        from .files import Files
+        from .projectinfo import ProjectInfo
+        self.Files = Files
+        self.ProjectInfo = ProjectInfo
+        Files.relpathscache = RelpathsCache()
+        ProjectInfo.seekcache = {}
+        self.pidtoconn = {}
+        self.interrupted = set()
+
+    def _warm(self, cwd):
+        self.Files.relpathscache.refresh()
+        try:
+            info = self.ProjectInfo.seek(cwd)
+            self.Files(info.projectdir, info.config.discovery.exclude.globs)
+        except Exception:
+            log.debug("Not warmed: %s", cwd, exc_info = True)
+
+    def _accept(self, listener):
+        conn = listener.accept()[0]
+        try:
+            data, ancdata, _, _ = conn.recvmsg(header.size, socket.CMSG_LEN(len(stdfds) * array('i').itemsize))
+            fds = array('i')
+            for level, type, fdsdata in ancdata:
+                if socket.SOL_SOCKET == level and socket.SCM_RIGHTS == type:
+                    fds.frombytes(fdsdata[:len(fdsdata) - len(fdsdata) % fds.itemsize])
+            request = json.loads(_recvexactly(conn, header.unpack(data)[0]).decode())
+        except Exception:
+            log.exception('Bad request.')
+            conn.close()
+            return None, None
+        self._warm(request['cwd'])
+        sys.stdout.flush()
+        sys.stderr.flush()
+        pid = os.fork()
+        if not pid:
+            self._child(listener, conn, fds, request)
+        for fd in fds:
+            os.close(fd)
+        self.pidtoconn[pid] = conn
+        return pid, conn
+
+    def _child(self, listener, conn, fds, request):
+        status = 1
+        try:
+            signal.set_wakeup_fd(-1)
+            signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.default_int_handler)
+            self.selector.close()
+            listener.close()
+            conn.close()
+            for fd, target in zip(fds, stdfds):
+                os.dup2(fd, target)
+            for fd in fds:
+                os.close(fd)
+            os.chdir(request['cwd'])
+            os.environ.clear()
+            os.environ.update(request['env'])
+            sys.argv[:] = request['argv']
+            if request['module'] not in warmmodules:
+                sys.exit("Not a daemon command: %s" % request['module'])
+            from . import daemon # Not necessarily this module, which may be __main__.
+            daemon.served = True
+            from importlib import import_module
+            import_module(request['module']).main()
+            status = 0
+        except SystemExit as e:
+            status = e.code if isinstance(e.code, int) else 0 if e.code is None else 1
+            if not isinstance(e.code, (int, type(None))):
+                sys.stderr.write("%s\n" % e.code)
+        except BaseException:
+            import traceback
+            traceback.print_exc()
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            os._exit(status)
+
+    def _reap(self):
+        while self.pidtoconn:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+            if not pid:
+                break
+            conn = self.pidtoconn.pop(pid)
+            if pid not in self.interrupted:
+                self.selector.unregister(conn)
+            self.interrupted.discard(pid)
+            try:
+                conn.sendall(header.pack(_exitstatus(status)))
+            except OSError:
+                pass
+            conn.close()
+
+    def _interrupt(self, pid, conn): # Client went away, or sent something it shouldn't have.
+        self.selector.unregister(conn)
+        self.interrupted.add(pid)
+        try:
+            os.kill(pid, signal.SIGINT)
+        except ProcessLookupError:
+            pass
+
+    def serve(self):
+        import selectors
+        for name in warmmodules:
+            try:
+                __import__(name)
+            except Exception:
+                log.warning("Failed to preload: %s", name, exc_info = True)
+        os.makedirs(os.path.dirname(socketpath), exist_ok = True)
+        if os.path.exists(socketpath):
+            os.remove(socketpath)
+        wakeupr, wakeupw = os.pipe()
+        for fd in wakeupr, wakeupw:
+            os.set_blocking(fd, False)
+        signal.set_wakeup_fd(wakeupw)
+        signal.signal(signal.SIGCHLD, lambda *args: None)
+        signal.signal(signal.SIGTERM, lambda *args: sys.exit())
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as listener, selectors.DefaultSelector() as self.selector:
+            umask = os.umask(0o077) # Owner only from the start, connecting means running commands as us.
+            try:
+                listener.bind(socketpath)
+            finally:
+                os.umask(umask)
+            listener.listen(16)
+            self.selector.register(listener, selectors.EVENT_READ)
+            self.selector.register(wakeupr, selectors.EVENT_READ)
+            log.info("Listening: %s", socketpath)
+            try:
+                while True:
+                    for key, _ in self.selector.select():
+                        if key.fileobj is listener:
+                            pid, conn = self._accept(listener)
+                            if pid is not None:
+                                self.selector.register(conn, selectors.EVENT_READ, pid)
+                        elif key.fileobj == wakeupr:
+                            os.read(wakeupr, 4096)
+                        else:
+                            self._interrupt(key.data, key.fileobj)
+                    self._reap()
+            finally:
+                os.remove(socketpath)
+
+def main():
+    from venvpool import initlogging
+    initlogging()
+    try:
+        Daemon().serve()
+    except KeyboardInterrupt:
+        pass
+
+if '__main__' == __name__:
+    main()
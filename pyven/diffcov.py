@@ -0,0 +1,53 @@
+# Copyright 2013, 2014, 2015, 2016, 2017, 2020, 2022 Andrzej Cichocki
+
+# This file is part of pyven.
+#
+# pyven is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyven is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyven.  If not, see <http://www.gnu.org/licenses/>.
+
+from collections import OrderedDict
+import json, os, re, subprocess
+
+hunkregex = re.compile(r'^@@ -\S+ \+([0-9]+)(?:,([0-9]+))? @@')
+
+def changedlines(root, commit):
+    changed = {}
+    path = None
+    for line in subprocess.check_output(['git', 'diff', '-U0', '--no-color', '--no-ext-diff', '--src-prefix=a/', '--dst-prefix=b/', commit, '--'], cwd = root).decode().splitlines():
+        if line.startswith('+++ '):
+            path = None if '/dev/null' == line[4:] else line[6:]
+            if path is not None:
+                changed.setdefault(path, set())
+        elif path is not None:
+            m = hunkregex.search(line)
+            if m is not None:
+                start = int(m.group(1))
+                changed[path].update(range(start, start + (1 if m.group(2) is None else int(m.group(2)))))
+    for path in subprocess.check_output(['git', 'ls-files', '--others', '--exclude-standard'], cwd = root).decode().splitlines():
+        changed[path] = None # All lines.
+    return changed
+
+def diffcoverage(root, reportpath, changed):
+    with open(reportpath) as f:
+        files = {(os.path.relpath(p, root) if os.path.isabs(p) else p): d for p, d in json.load(f)['files'].items()}
+    summary = OrderedDict()
+    for path in sorted(changed):
+        d = files.get(path)
+        if d is not None:
+            executed = set(d['executed_lines'])
+            statements = executed | set(d['missing_lines'])
+            if changed[path] is not None:
+                statements &= changed[path]
+            if statements:
+                summary[path] = len(statements & executed), len(statements), sorted(statements - executed)
+    return summary
@@ -16,13 +16,67 @@
 # along with pyven.  If not, see <http://www.gnu.org/licenses/>.
 
 'Build a Docker image with automatic tag.'
+from .files import Files
 from .projectinfo import ProjectInfo
-import os
+from .util import Excludes, formatsize
+from argparse import ArgumentParser
+from venvpool import initlogging
+import logging, os, subprocess, sys, tarfile, time
+
+log = logging.getLogger(__name__)
+
+class CountingWriter:
+
+    def __init__(self, f):
+        self.count = 0
+        self.f = f
+
+    def write(self, data):
+        self.count += len(data)
+        return self.f.write(data)
+
+def _gitpaths(projectdir): # Ignored directories are never walked, and nothing goes in argv.
+    for path in subprocess.check_output(['git', 'ls-files', '-co', '--exclude-standard', '-z'], cwd = projectdir).decode().split('\0'):
+        if path and os.path.lexists(os.path.join(projectdir, path)) and not os.path.isdir(os.path.join(projectdir, path)): # Skip deleted files and submodules.
+            yield path
+
+def contextpaths(info):
+    context = info.config.docker.context
+    includes = Excludes(context.include.globs)
+    if os.path.isdir(os.path.join(info.projectdir, '.git')):
+        excludes = Excludes(context.exclude.globs)
+        paths = (p for p in _gitpaths(info.projectdir) if p not in excludes)
+    else:
+        paths = Files.relpaths(info.projectdir, [''], [], ['.git/**', '.hg/**'] + list(context.exclude.globs))
+    return [p for p in paths if not context.include.globs or p in includes or 'Dockerfile' == p]
 
 def main():
+    initlogging()
+    parser = ArgumentParser()
+    parser.add_argument('--buildkit', action = 'store_true', help = 'build with BuildKit, needed for cache mounts')
+    args = parser.parse_args()
     info = ProjectInfo.seek('.')
-    command = 'docker', 'build', '-t', info.config.docker.tag, info.projectdir
-    os.execvp(command[0], command)
+    env = os.environ.copy()
+    if args.buildkit or info.config.docker.buildkit:
+        env['DOCKER_BUILDKIT'] = '1'
+    start = time.time()
+    paths = contextpaths(info)
+    process = subprocess.Popen(['docker', 'build', '-t', info.config.docker.tag, '-'], stdin = subprocess.PIPE, env = env)
+    writer = CountingWriter(process.stdin)
+    try:
+        with tarfile.open(fileobj = writer, mode = 'w|') as tar:
+            for path in paths:
+                tar.add(os.path.join(info.projectdir, path), path, recursive = False)
+        process.stdin.close()
+    except BrokenPipeError:
+        log.error("Docker stopped reading context after %s.", formatsize(writer.count))
+        try:
+            process.stdin.close()
+        except BrokenPipeError:
+            pass
+    else:
+        log.info("Sent context of %s files, %s in %.1fs", len(paths), formatsize(writer.count), time.time() - start)
+    sys.exit(process.wait())
 
 if '__main__' == __name__:
     main()
@@ -15,14 +15,25 @@
 # You should have received a copy of the GNU General Public License
 # along with pyven.  If not, see <http://www.gnu.org/licenses/>.
 
-from .util import stripeol
+from .util import Excludes, stripeol
 from collections import defaultdict
-import os, subprocess, xml.dom.minidom as dom
+from copy import copy
+import json, os, subprocess, xml.dom.minidom as dom
 
 class Files:
 
+    historylen = 10
+    relpathscache = None
+    selectedtests = None
+    srcsuffixes = sum(([s, "%s.aridt" % s] for s in ['.py', '.py3', '.pyx', '.s', '.sh', '.h', '.cpp', '.cxx', '.arid', '.gradle', '.java', '.mk']), [])
+    srcprefixes = ['Dockerfile', 'Makefile']
+
+    @classmethod
+    def issrcname(cls, name):
+        return name.endswith(tuple(cls.srcsuffixes)) or name.startswith(tuple(cls.srcprefixes))
+
     @staticmethod
-    def _findfiles(walkpath, suffixes, prefixes):
+    def _findfiles(walkpath, suffixes, prefixes, excludes):
         def acceptname():
             for suffix in suffixes:
                 if name.endswith(suffix):
@@ -32,14 +43,24 @@ class Files:
                     return True
         prefixlen = len(walkpath + os.sep)
         for dirpath, dirnames, filenames in os.walk(walkpath):
+            dirrelpath = dirpath[prefixlen:]
+            checkexcludes = excludes.mayexclude(dirrelpath)
             for name in sorted(filenames):
                 if acceptname():
-                    yield os.path.join(dirpath, name)[prefixlen:]
-            dirnames.sort()
+                    relpath = os.path.join(dirpath, name)[prefixlen:]
+                    if not (checkexcludes and relpath in excludes):
+                        yield relpath
+            dirnames[:] = sorted(n for n in dirnames if not excludes.excludesall(os.path.join(dirrelpath, n)))
+
+    @classmethod
+    def relpaths(cls, root, suffixes, prefixes, excludeglobs = ()):
+        if cls.relpathscache is None:
+            return cls._relpaths(root, suffixes, prefixes, excludeglobs)
+        return cls.relpathscache.get(cls._relpaths, root, suffixes, prefixes, excludeglobs)
 
     @classmethod
-    def relpaths(cls, root, suffixes, prefixes):
-        paths = list(cls._findfiles(root, suffixes, prefixes))
+    def _relpaths(cls, root, suffixes, prefixes, excludeglobs):
+        paths = list(cls._findfiles(root, suffixes, prefixes, Excludes(excludeglobs)))
         with open(os.devnull) as devnull:
             if not subprocess.call(['hg', 'root'], stdout = devnull, stderr = devnull, cwd = root):
                 badstatuses = set('IR ')
@@ -59,28 +80,78 @@ class Files:
                         if path not in ignored:
                             yield path
 
-    def __init__(self, root):
-        srcsuffixes = sum(([s, "%s.aridt" % s] for s in ['.py', '.py3', '.pyx', '.s', '.sh', '.h', '.cpp', '.cxx', '.arid', '.gradle', '.java', '.mk']), [])
-        self.allsrcpaths = [os.path.join(root, p) for p in self.relpaths(root, srcsuffixes, ['Dockerfile', 'Makefile'])]
+    def __init__(self, root, excludeglobs = ()):
+        self.allsrcpaths = [os.path.join(root, p) for p in self.relpaths(root, self.srcsuffixes, self.srcprefixes, excludeglobs)]
         self.pypaths = [p for p in self.allsrcpaths if p.endswith('.py')]
         self.root = root
 
+    def excluding(self, globs, paths):
+        excludes = Excludes(globs)
+        prefixlen = len(self.root + os.sep)
+        return [p for p in paths if p[prefixlen:] not in excludes]
+
+    def subset(self, srcpaths, testpaths):
+        files = copy(self)
+        files.allsrcpaths = [p for p in self.allsrcpaths if p in srcpaths]
+        files.pypaths = [p for p in self.pypaths if p in srcpaths]
+        files.selectedtests = testpaths
+        return files
+
+    def _alltestpaths(self):
+        if self.selectedtests is not None:
+            return list(self.selectedtests)
+        return [p for p in self.pypaths if os.path.basename(p).startswith('test_')]
+
+    def _testcases(self, reportpath, paths):
+        with open(reportpath) as f:
+            doc = dom.parse(f)
+        nametopath = dict([p[len(self.root + os.sep):-len('.py')].replace(os.sep, '.'), p] for p in paths)
+        for e in doc.getElementsByTagName('testcase'):
+            name = e.getAttribute('classname') # Just the module for pytest functions.
+            while name not in nametopath:
+                i = name.rfind('.')
+                if -1 == i:
+                    break
+                name = name[:i]
+            else:
+                yield nametopath[name], e
+
+    @staticmethod
+    def _historypath(reportpath):
+        return os.path.join(os.path.dirname(reportpath), 'history.json')
+
+    def _loadhistory(self, reportpath):
+        try:
+            with open(self._historypath(reportpath)) as f:
+                return json.load(f)
+        except (IOError, ValueError):
+            return {}
+
+    def _relpath(self, path):
+        return path[len(self.root + os.sep):]
+
+    def recordhistory(self, reportpath):
+        passed = {}
+        for path, e in self._testcases(reportpath, self._alltestpaths()):
+            ok = not (e.getElementsByTagName('failure') or e.getElementsByTagName('error'))
+            passed[path] = passed.get(path, True) and ok
+        history = self._loadhistory(reportpath)
+        for path, ok in passed.items():
+            outcomes = history.setdefault(self._relpath(path), [])
+            outcomes.append(ok)
+            del outcomes[:-self.historylen]
+        with open(self._historypath(reportpath), 'w') as f:
+            json.dump(history, f, indent = 2, sort_keys = True)
+
     def testpaths(self, reportpath):
-        paths = [p for p in self.pypaths if os.path.basename(p).startswith('test_')]
+        paths = self._alltestpaths()
         if os.path.exists(reportpath):
-            with open(reportpath) as f:
-                doc = dom.parse(f)
-            nametopath = dict([p[len(self.root + os.sep):-len('.py')].replace(os.sep, '.'), p] for p in paths)
             pathtotime = defaultdict(int)
-            for e in doc.getElementsByTagName('testcase'):
-                name = e.getAttribute('classname')
-                while True:
-                    i = name.rfind('.')
-                    if -1 == i:
-                        break
-                    name = name[:i]
-                    if name in nametopath:
-                        pathtotime[nametopath[name]] += float(e.getAttribute('time'))
-                        break
-            paths.sort(key = lambda p: pathtotime.get(p, float('inf')))
+            for path, e in self._testcases(reportpath, paths):
+                pathtotime[path] += float(e.getAttribute('time'))
+            history = self._loadhistory(reportpath)
+            def failurerank(path): # Most recently failed first.
+                outcomes = history.get(self._relpath(path), [])
+                return 0 if outcomes and not outcomes[-1] else 1 if not all(outcomes) else 2
+            paths.sort(key = lambda p: (failurerank(p), pathtotime.get(p, float('inf'))))
         return paths
@@ -0,0 +1,77 @@
+# Copyright 2013, 2014, 2015, 2016, 2017, 2020, 2022 Andrzej Cichocki
+
+# This file is part of pyven.
+#
+# pyven is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyven is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyven.  If not, see <http://www.gnu.org/licenses/>.
+
+from http import HTTPStatus
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+import json, logging, os, time
+
+log = logging.getLogger(__name__)
+
+class OfflineException(Exception): pass
+
+class RepoMetadata:
+
+    defaultdelay = 60
+
+    def __init__(self, apiurl, cachedir, ttl, offline):
+        self.apiurl = apiurl
+        self.cachedir = cachedir
+        self.ttl = ttl
+        self.offline = offline
+
+    def _cachepath(self, urlpath):
+        return os.path.join(self.cachedir, "%s.json" % urlpath.replace('/', '_'))
+
+    def _ratelimitdelay(self, e):
+        reset = e.headers.get('X-RateLimit-Reset')
+        return self.defaultdelay if reset is None else max(1, int(reset) - time.time())
+
+    def get(self, urlpath):
+        cachepath = self._cachepath(urlpath)
+        try:
+            with open(cachepath) as f:
+                entry = json.load(f)
+        except (IOError, ValueError):
+            entry = None
+        if entry is not None and (self.offline or time.time() - entry['fetched'] < self.ttl):
+            return entry['data']
+        if self.offline:
+            raise OfflineException(urlpath)
+        while True:
+            request = Request("%s/repos/%s" % (self.apiurl, urlpath))
+            if entry is not None and entry['etag'] is not None:
+                request.add_header('If-None-Match', entry['etag'])
+            try:
+                with urlopen(request) as f:
+                    entry = dict(etag = f.headers.get('ETag'), data = json.loads(f.read().decode()))
+                break
+            except HTTPError as e:
+                if HTTPStatus.NOT_MODIFIED == e.code:
+                    log.debug("Not modified: %s", urlpath)
+                    break
+                if HTTPStatus.FORBIDDEN != e.code:
+                    raise
+                delay = self._ratelimitdelay(e)
+                log.info("Sleep %.0f seconds due to: %s", delay, e)
+                time.sleep(delay)
+        entry['fetched'] = time.time()
+        os.makedirs(self.cachedir, exist_ok = True)
+        with open(cachepath + '.part', 'w') as f:
+            json.dump(entry, f)
+        os.rename(cachepath + '.part', cachepath)
+        return entry['data']
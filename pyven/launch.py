@@ -16,25 +16,78 @@
 # along with pyven.  If not, see <http://www.gnu.org/licenses/>.
 
 'Run project using a suitable venv from the pool.'
-from .pipify import InstallDeps
-from .projectinfo import ProjectInfo
+from .daemon import daemonable
+from .files import Files
+from .util import Excludes, Path
 from argparse import ArgumentParser
-from venvpool import initlogging, Pool
-import subprocess, sys
+from venvpool import initlogging, Venv
+import hashlib, json, logging, os, subprocess, sys
 
+log = logging.getLogger(__name__)
+cacherelpath = os.path.join('var', 'launch.json')
+
+def _fingerprint(projectdir, aridpath):
+    h = hashlib.sha1(str(sys.version_info.major).encode())
+    with open(aridpath, 'rb') as f:
+        h.update(f.read())
+    for relpath in Files._findfiles(projectdir, ['.py'], [], Excludes(['.*/**', 'var/**'])):
+        h.update(("%s\0%s\0" % (relpath, os.stat(os.path.join(projectdir, relpath)).st_mtime_ns)).encode())
+    return h.hexdigest()
+
+def _command(console_scripts, name):
+    for console_script in console_scripts:
+        command, objref = console_script.split('=')
+        if name is None or name == command:
+            modulename, qname = objref.split(':')
+            return "from %s import %s; %s()" % (modulename, qname.split('.')[0], qname)
+    raise Exception("No such console script: %s" % name)
+
+def _exec(venvpath, console_scripts, name):
+    readlock = Venv(venvpath).tryreadlock() # Inherited by the program, released when it exits.
+    if readlock is None:
+        return
+    python = os.path.join(venvpath, 'bin', 'python')
+    os.execv(python, [python, '-c', _command(console_scripts, name)])
+
+@daemonable
 def main(): # TODO: Retire in favour of venvpool module.
     initlogging()
     parser = ArgumentParser()
     parser.add_argument('--build', action = 'store_true', help = 'rebuild native components')
+    parser.add_argument('--script', help = 'console script to run, default first')
     args = parser.parse_args()
+    aridpath = Path.seek('.', 'project.arid')
+    if aridpath is not None and not args.build:
+        cachepath = os.path.join(aridpath.parent, cacherelpath)
+        fingerprint = _fingerprint(aridpath.parent, aridpath)
+        try:
+            with open(cachepath) as f:
+                cached = json.load(f)
+        except (IOError, ValueError):
+            cached = {}
+        if cached.get('fingerprint') == fingerprint and os.path.isdir(cached['venvpath']):
+            _exec(cached['venvpath'], cached['console_scripts'], args.script)
+            log.debug("Cached venv unavailable: %s", cached['venvpath'])
+            os.remove(cachepath)
+    from .pipify import InstallDeps
+    from .projectinfo import ProjectInfo
+    from venvpool import Pool
     info = ProjectInfo.seekany('.')
-    _, objref = next(iter(info.console_scripts())).split('=') # XXX: Support more than just the first?
-    modulename, qname = objref.split(':')
-    with InstallDeps(info, False, None) as installdeps, Pool(sys.version_info.major).readonlyorreadwrite[args.build](installdeps) as venv:
-        if args.build:
-            venv.install(['--no-deps', '-e', info.projectdir]) # XXX: Can this be done without venv install?
-        status = subprocess.call([venv.programpath('python'), '-c', "from %s import %s; %s()" % (modulename, qname.split('.')[0], qname)])
-    sys.exit(status)
+    console_scripts = info.console_scripts()
+    while True:
+        with InstallDeps(info, False, None) as installdeps, Pool(sys.version_info.major).readonlyorreadwrite[args.build](installdeps) as venv:
+            if args.build:
+                venv.install(['--no-deps', '-e', info.projectdir]) # XXX: Can this be done without venv install?
+                sys.exit(subprocess.call([venv.programpath('python'), '-c', _command(console_scripts, args.script)]))
+            venvpath = os.path.abspath(venv.venvpath)
+        if aridpath is not None:
+            os.makedirs(os.path.dirname(cachepath), exist_ok = True)
+            with open(cachepath, 'w') as f:
+                json.dump(dict(fingerprint = fingerprint, venvpath = venvpath, console_scripts = console_scripts), f)
+        _exec(venvpath, console_scripts, args.script)
+        log.info("Venv went away before launch, retry: %s", venvpath) # Typically evicted.
+        if aridpath is not None:
+            os.remove(cachepath)
 
 if '__main__' == __name__:
     main()
@@ -16,9 +16,11 @@
 # along with pyven.  If not, see <http://www.gnu.org/licenses/>.
 
 'Print project.arid snippet pinning requires to their minimum allowed versions.'
+from .daemon import daemonable
 from .projectinfo import ProjectInfo
 from venvpool import initlogging
 
+@daemonable
 def main():
     initlogging()
     print("requires = $list(%s)" % ' '.join(r.minstr() for r in ProjectInfo.seek('.').parsedrequires()))
@@ -0,0 +1,72 @@
+# Copyright 2013, 2014, 2015, 2016, 2017, 2020, 2022 Andrzej Cichocki
+
+# This file is part of pyven.
+#
+# pyven is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyven is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyven.  If not, see <http://www.gnu.org/licenses/>.
+
+from collections import defaultdict
+import os, xml.dom.minidom as dom
+
+def testcasedurations(reportpath):
+    with open(reportpath) as f:
+        doc = dom.parse(f)
+    return dict(["%s.%s" % (e.getAttribute('classname'), e.getAttribute('name')), float(e.getAttribute('time'))] for e in doc.getElementsByTagName('testcase'))
+
+def median(v):
+    v = sorted(v)
+    n = len(v)
+    return v[n // 2] if n % 2 else (v[n // 2 - 1] + v[n // 2]) / 2
+
+class DurationHistory: # Append-only rows of run, test id and seconds, compacted when twice the window.
+
+    def __init__(self, path, window):
+        self.path = path
+        self.window = window
+
+    def _load(self):
+        runs = defaultdict(dict)
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                for line in f:
+                    run, testid, seconds = line.rstrip('\n').split('\t')
+                    runs[int(run)][testid] = float(seconds)
+        return runs
+
+    def _write(self, mode, runs):
+        with open(self.path, mode) as f:
+            for run in sorted(runs):
+                for testid, seconds in sorted(runs[run].items()):
+                    f.write("%s\t%s\t%.6f\n" % (run, testid, seconds))
+
+    def regressions(self, durations, threshold, mindelta):
+        runs = self._load()
+        history = defaultdict(list)
+        for run in sorted(runs)[-self.window:]:
+            for testid, seconds in runs[run].items():
+                history[testid].append(seconds)
+        for testid, seconds in sorted(durations.items()):
+            if testid in history:
+                baseline = median(history[testid])
+                if seconds - baseline > max(mindelta, baseline * threshold):
+                    yield testid, baseline, seconds
+
+    def record(self, durations):
+        runs = self._load()
+        run = max(runs) + 1 if runs else 0
+        if len(runs) >= 2 * self.window:
+            keep = {r: runs[r] for r in sorted(runs)[len(runs) - self.window + 1:]}
+            keep[run] = durations
+            self._write('w', keep)
+        else:
+            self._write('a', {run: durations})
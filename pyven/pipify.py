@@ -16,16 +16,20 @@
 # along with pyven.  If not, see <http://www.gnu.org/licenses/>.
 
 'Generate setuptools files for a project.arid project.'
+from .clone import ClonePool
+from .daemon import daemonable
 from .projectinfo import ProjectInfo, Req, SimpleInstallDeps
 from .sourceinfo import SourceInfo
+from .trace import addtraceoption, traced, tracing
 from argparse import ArgumentParser
 from pkg_resources import resource_filename
 from tempfile import mkdtemp
-from venvpool import initlogging, Pool
+from venvpool import initlogging
 import logging, os, shutil, subprocess, sys
 
 log = logging.getLogger(__name__)
 
+@traced('pipify')
 def pipify(info, version = None):
     release = version is not None
     # Allow release of project without origin:
@@ -38,6 +42,9 @@ def pipify(info, version = None):
     if not release:
         config.put('author', scalar = None)
     config.put('py_modules', scalar = info.py_modules())
+    sourceinfo = SourceInfo(info.projectdir)
+    config.put('packages', scalar = sourceinfo.packages)
+    config.put('extmodules', scalar = [[p.module, p.path] for p in sourceinfo.extpaths])
     config.put('install_requires', scalar = info.allrequires())
     config.put('scripts', scalar = info.scripts())
     config.put('console_scripts', scalar = info.console_scripts())
@@ -48,7 +55,7 @@ def pipify(info, version = None):
         ['setup.cfg', 'void'],
     ]
     seen = set()
-    for name in allbuildrequires(info):
+    for name in allbuildrequires(info, sourceinfo):
         if name not in seen:
             seen.add(name)
             config.printf("build requires += %s", name)
@@ -60,27 +67,30 @@ def pipify(info, version = None):
                 resource_filename(__name__, name + '.aridt'), # TODO LATER: Make aridity get the resource.
                 os.path.abspath(os.path.join(info.projectdir, name)))
 
-def allbuildrequires(info):
+def allbuildrequires(info, sourceinfo = None):
     yield 'setuptools'
     yield 'wheel'
     reqs = set()
-    for p in SourceInfo(info.projectdir).extpaths:
+    for p in (SourceInfo(info.projectdir) if sourceinfo is None else sourceinfo).extpaths:
         reqs.update(p.buildrequires())
     for r in sorted(reqs):
         yield r
     for r in info.config.build.requires:
         yield r
 
+@daemonable
 def main():
     initlogging()
     parser = ArgumentParser()
     parser.add_argument('--transient', action = 'store_true')
     parser.add_argument('--version')
     parser.add_argument('projectdir', nargs = '?') # FIXME: When projectdir is passed in its console_scripts are not populated!
+    addtraceoption(parser)
     args = parser.parse_args()
-    info = ProjectInfo.seek('.') if args.projectdir is None else ProjectInfo(args.projectdir, os.path.join(args.projectdir, ProjectInfo.projectaridname))
-    pipify(info, args.version)
-    setupcommand(info, sys.version_info.major, args.transient, 'egg_info')
+    with tracing(args.trace):
+        info = ProjectInfo.seek('.') if args.projectdir is None else ProjectInfo(args.projectdir, os.path.join(args.projectdir, ProjectInfo.projectaridname))
+        pipify(info, args.version)
+        setupcommand(info, sys.version_info.major, args.transient, 'egg_info')
 
 def setupcommand(info, pyversion, transient, *command):
     def setup(absexecutable):
@@ -89,7 +99,7 @@ def setupcommand(info, pyversion, transient, *command):
     if {'setuptools', 'wheel'} == set(buildreqs) and sys.version_info.major == pyversion:
         setup(sys.executable)
     else:
-        with Pool(pyversion).readonlyortransient[transient](SimpleInstallDeps(buildreqs)) as venv:
+        with ClonePool(pyversion).readonlyortransient[transient](SimpleInstallDeps(buildreqs)) as venv:
             setup(venv.programpath('python'))
 
 class VolatileReq:
@@ -110,11 +120,16 @@ class InstallDeps:
     def pypireqs(self):
         return [VolatileReq(i) for i in self.volatileprojects] + self.fetchreqs
 
+    @property
+    def templatereqs(self):
+        return [r.reqstr for r in self.fetchreqs]
+
     def __init__(self, info, siblings, localrepo):
         self.info = info
         self.siblings = siblings
         self.localrepo = localrepo
 
+    @traced('InstallDeps.__enter__')
     def __enter__(self):
         self.workspace = mkdtemp()
         editableprojects = {}
@@ -0,0 +1,133 @@
+# Copyright 2013, 2014, 2015, 2016, 2017, 2020, 2022 Andrzej Cichocki
+
+# This file is part of pyven.
+#
+# pyven is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyven is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyven.  If not, see <http://www.gnu.org/licenses/>.
+
+from .perf import median
+from .util import stderr
+from collections import defaultdict
+from contextlib import contextmanager
+from threading import Lock
+import json, os, sys, time
+
+current = None
+
+class PhaseHistory:
+
+    window = 10
+
+    def __init__(self, path):
+        self.path = path
+        try:
+            with open(path) as f:
+                self.durations = json.load(f)
+        except (IOError, ValueError):
+            self.durations = {}
+
+    def estimate(self, name):
+        v = self.durations.get(name)
+        if v:
+            return median(v)
+
+    def record(self, name, seconds):
+        v = self.durations.setdefault(name, [])
+        v.append(round(seconds, 3))
+        del v[:-self.window]
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok = True)
+        with open(self.path + '.part', 'w') as f:
+            json.dump(self.durations, f, indent = 2, sort_keys = True)
+        os.replace(self.path + '.part', self.path)
+
+class Unit:
+
+    def __init__(self, name, stage = 0, lane = 0, fallback = None, note = ''):
+        self.name = name
+        self.stage = stage
+        self.lane = lane
+        self.fallback = fallback
+        self.note = note
+
+    def shifted(self, stages):
+        return type(self)(self.name, self.stage + stages, self.lane, self.fallback, self.note)
+
+def formatseconds(seconds):
+    m, s = divmod(int(round(seconds)), 60)
+    return "%sm%02ds" % (m, s) if m else "%ss" % s
+
+class Plan:
+
+    def __init__(self, units, history):
+        self.units = units
+        self.estimates = {}
+        for u in units:
+            e = history.estimate(u.name)
+            self.estimates[u.name] = u.fallback if e is None else e
+
+    def serial(self):
+        return sum(e for e in self.estimates.values() if e is not None)
+
+    def parallel(self):
+        stages = defaultdict(lambda: defaultdict(float))
+        for u in self.units:
+            stages[u.stage][u.lane] += self.estimates[u.name] or 0
+        return sum(max(lanes.values()) for lanes in stages.values())
+
+    def show(self):
+        for u in sorted(self.units, key = lambda u: (u.stage, u.lane)):
+            e = self.estimates[u.name]
+            print("%2s.%-2s %8s %s%s" % (u.stage, u.lane, '?' if e is None else formatseconds(e), u.name, " (%s)" % u.note if u.note else ''))
+        unknown = sum(1 for e in self.estimates.values() if e is None)
+        print("Serial: %s, parallel: %s%s" % (formatseconds(self.serial()), formatseconds(self.parallel()), ", plus %s units without history" % unknown if unknown else ''))
+
+class Live:
+
+    def __init__(self, plan, history):
+        self.plan = plan
+        self.history = history
+        self.start = time.time()
+        self.done = set()
+        self.lock = Lock()
+
+    def finished(self, name, seconds):
+        with self.lock:
+            self.history.record(name, seconds)
+            self.done.add(name)
+            remaining = sum(e for n, e in self.plan.estimates.items() if n not in self.done and e is not None)
+            total = len(self.plan.units)
+            stderr("[%s/%s] %s elapsed, ETA %s" % (sum(1 for u in self.plan.units if u.name in self.done), total, formatseconds(time.time() - self.start), formatseconds(remaining)))
+
+@contextmanager
+def unit(name):
+    start = time.time()
+    yield
+    if current is not None:
+        current.finished(name, time.time() - start)
+
+@contextmanager
+def planning(historypath, units):
+    global current
+    history = PhaseHistory(historypath)
+    current = Live(Plan(units, history), history)
+    try:
+        yield
+    finally:
+        current = None
+        history.save()
+
+def showplan(historypath, units):
+    Plan(units, PhaseHistory(historypath)).show()
+    sys.stdout.flush()
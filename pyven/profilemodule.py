@@ -0,0 +1,32 @@
+# Copyright 2013, 2014, 2015, 2016, 2017, 2020, 2022 Andrzej Cichocki
+
+# This file is part of pyven.
+#
+# pyven is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyven is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyven.  If not, see <http://www.gnu.org/licenses/>.
+
+import cProfile, json, resource, runpy, sys
+
+def main():
+    statspath, memorypath, module = sys.argv[1:4]
+    sys.argv[1:4] = []
+    profile = cProfile.Profile()
+    try:
+        profile.runcall(runpy.run_module, module, run_name = '__main__', alter_sys = True)
+    finally:
+        profile.dump_stats(statspath)
+        with open(memorypath, 'w') as f:
+            json.dump(dict(maxrsskib = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss), f)
+
+if ('__main__' == __name__):
+    main()
@@ -17,7 +17,9 @@
 
 from . import mainmodules
 from .files import Files
+from .trace import span
 from .util import Path
+from ast import literal_eval
 from aridity.config import ConfigCtrl
 from aridity.util import openresource
 from inspect import getsource
@@ -59,7 +61,7 @@ class Req:
         for r in cls.parselines(reqstrs):
             try:
                 # FIXME: Allow running tests offline.
-                with urlopen(Request("https://pypi.org/simple/%s/" % quote(r.namepart, safe = ''), method = 'HEAD')):
+                with span('Req.published', name = r.namepart), urlopen(Request("https://pypi.org/simple/%s/" % quote(r.namepart, safe = ''), method = 'HEAD')):
                     pass
                 yield r
             except HTTPError as e:
@@ -116,16 +118,28 @@ class SimpleInstallDeps(ParsedRequires):
 
     parselines = staticmethod(Req.parselines)
 
+    @property
+    def templatereqs(self):
+        return [r.reqstr for r in self.pypireqs]
+
 class ProjectInfo:
 
     projectaridname = 'project.arid'
+    seekcache = None
 
     @classmethod
     def seek(cls, realdir):
         path = Path.seek(realdir, cls.projectaridname)
         if path is None:
             raise ProjectInfoNotFoundException(realdir)
-        return cls(path.parent, path)
+        if cls.seekcache is None:
+            return cls(path.parent, path)
+        key = os.path.abspath(path)
+        mtime = os.stat(key).st_mtime_ns
+        entry = cls.seekcache.get(key)
+        if entry is None or entry[0] != mtime:
+            cls.seekcache[key] = entry = mtime, cls(os.path.dirname(key), key)
+        return entry[1]
 
     @classmethod
     def seekany(cls, realdir):
@@ -167,11 +181,11 @@ class ProjectInfo:
     def localrequires(self):
         return [r.namepart for r in self.parsedrequires() if r.isproject(self)]
 
-    def nextversion(self): # XXX: Deduce from tags instead?
+    def nextversion(self, indexurl = 'https://pypi.org/simple/'): # XXX: Deduce from tags instead?
         import urllib.request, urllib.error, re, xml.dom.minidom as dom
         pattern = re.compile('-([0-9]+)[-.]')
         try:
-            with urllib.request.urlopen("https://pypi.org/simple/%s/" % self.config.name) as f:
+            with urllib.request.urlopen("%s/%s/" % (indexurl.rstrip('/'), self.config.name)) as f:
                 doc = dom.parseString(subprocess.check_output(['tidy', '-asxml'], input = f.read()))
             last = max(int(pattern.search(textcontent(a)).group(1)) for a in doc.getElementsByTagName('a'))
         except urllib.error.HTTPError as e:
@@ -181,17 +195,12 @@ class ProjectInfo:
         return str(max(10, last + 1))
 
     def descriptionandurl(self):
-        import urllib.error, urllib.request, json, time
+        from .github import RepoMetadata
+        from .util import cachedir
         urlpath = "combatopera/%s" % self.config.name # TODO: Make configurable.
-        while True:
-            try:
-                with urllib.request.urlopen("https://api.github.com/repos/%s" % urlpath) as f:
-                    return json.loads(f.read().decode())['description'], "https://github.com/%s" % urlpath
-            except urllib.error.HTTPError as e:
-                if 403 != e.code:
-                    raise
-                log.info("Sleep 1 minute due to: %s", e)
-                time.sleep(60)
+        github = self.config.github
+        metadata = RepoMetadata(github.api.url, os.path.join(cachedir, 'github'), github.ttl, github.offline).get(urlpath)
+        return metadata['description'], "https://github.com/%s" % urlpath
 
     def py_modules(self):
         suffix = '.py'
@@ -205,15 +214,23 @@ class ProjectInfo:
         return [name for name in os.listdir(self.projectdir) if isscript(os.path.join(self.projectdir, name))]
 
     def mainmodules(self):
+        from .store import fileparts, fingerprint, openstore
         paths = list(Files.relpaths(self.projectdir, [mainmodules.extension], []))
-        with TemporaryDirectory() as tempdir:
-            scriptpath = os.path.join(tempdir, 'mainmodules.py')
-            with open(scriptpath, 'w') as f:
-                f.write(getsource(mainmodules))
-            with open(os.path.join(tempdir, 'venvpool.py'), 'w') as f:
-                f.write(getsource(venvpool))
-            for line in subprocess.check_output(["python%s" % next(iter(self.config.pyversions)), scriptpath, self.projectdir] + paths).splitlines():
-                yield MainModule(eval(line))
+        pyversion = next(iter(self.config.pyversions))
+        store = openstore(self.config)
+        key = fingerprint('mainmodules', pyversion, getsource(mainmodules), getsource(venvpool), *fileparts(self.projectdir, [os.path.join(self.projectdir, p) for p in paths]))
+        output = store.get(key)
+        if output is None:
+            with TemporaryDirectory() as tempdir:
+                scriptpath = os.path.join(tempdir, 'mainmodules.py')
+                with open(scriptpath, 'w') as f:
+                    f.write(getsource(mainmodules))
+                with open(os.path.join(tempdir, 'venvpool.py'), 'w') as f:
+                    f.write(getsource(venvpool))
+                output = subprocess.check_output(["python%s" % pyversion, scriptpath, self.projectdir] + paths)
+            store.put(key, output)
+        for line in output.splitlines():
+            yield MainModule(literal_eval(line.decode())) # Output may come from a shared store.
 
     def console_scripts(self):
         return [mm.console_script for mm in self.mainmodules()]
@@ -18,9 +18,14 @@
 'Release project to PyPI, with manylinux wheels as needed.'
 from . import targetremote
 from .checks import EveryVersion
+from .clone import ClonePool
 from .pipify import allbuildrequires, InstallDeps, pipify
+from .plan import planning, showplan, Unit, unit
 from .projectinfo import ProjectInfo, SimpleInstallDeps
 from .sourceinfo import SourceInfo
+from .store import fingerprint, openstore
+from .trace import addtraceoption, traced, tracing
+from .upload import existingfiles, Uploader
 from .util import bgcontainer
 from argparse import ArgumentParser
 from aridity.config import ConfigCtrl
@@ -31,7 +36,7 @@ from pkg_resources import resource_filename
 from subprocess import CalledProcessError
 from tempfile import NamedTemporaryFile
 from venvpool import dotpy, initlogging, Pip, Pool, TemporaryDirectory
-import lagoon, logging, os, re, shutil, sys, sysconfig
+import json, lagoon, logging, os, re, shutil, sys, sysconfig
 
 log = logging.getLogger(__name__)
 distrelpath = 'dist'
@@ -71,6 +76,7 @@ class Image:
         self.plat = plat
         self.arch = arch
 
+    @traced('Image.makewheels')
     def makewheels(self, info): # TODO: This code would benefit from modern syntax.
         from lagoon import docker
         from lagoon.program import NOEOL
@@ -103,29 +109,55 @@ def main():
     config = ConfigCtrl().loadappconfig(main, 'release.arid')
     parser = ArgumentParser()
     parser.add_argument('--upload', action = 'store_true')
+    parser.add_argument('--plan', action = 'store_true', help = 'list the units this release would perform with estimated durations, then exit')
+    parser.add_argument('--train', nargs = '+', metavar = 'PATH', help = 'release these workspace projects in dependency order, resuming any interrupted train')
     parser.add_argument('path', nargs = '?', default = '.')
+    addtraceoption(parser)
     parser.parse_args(namespace = config.cli)
-    info = ProjectInfo.seek(config.path)
-    git = lagoon.git[partial](cwd = info.projectdir)
-    if git.status.__porcelain():
-        raise Exception('Uncommitted changes!')
-    log.debug('No uncommitted changes.')
-    remotename, _ = git.rev_parse.__abbrev_ref('@{u}').split('/')
-    if targetremote != remotename:
-        raise Exception("Current branch must track some %s branch." % targetremote)
-    log.debug("Good remote: %s", remotename)
-    with TemporaryDirectory() as tempdir:
-        copydir = os.path.join(tempdir, os.path.basename(os.path.abspath(info.projectdir)))
-        log.info("Copying project to: %s", copydir)
-        shutil.copytree(info.projectdir, copydir)
-        for relpath in release(config, git, ProjectInfo.seek(copydir)):
-            log.info("Replace artifact: %s", relpath)
-            destpath = os.path.join(info.projectdir, relpath)
-            try:
-                os.makedirs(os.path.dirname(destpath))
-            except OSError:
-                pass
-            shutil.copy2(os.path.join(copydir, relpath), destpath)
+    with tracing(config.trace):
+        if config.train:
+            from .train import Train
+            Train([ProjectInfo.seek(p) for p in config.train], config.upload, config.index.url, config.parallel.releases).run()
+            return
+        info = ProjectInfo.seek(config.path)
+        historypath = os.path.join(info.projectdir, 'var', 'releasephases.json')
+        if config.plan:
+            showplan(historypath, _units(info, config.upload))
+            return
+        git = lagoon.git[partial](cwd = info.projectdir)
+        if git.status.__porcelain():
+            raise Exception('Uncommitted changes!')
+        log.debug('No uncommitted changes.')
+        remotename, _ = git.rev_parse.__abbrev_ref('@{u}').split('/')
+        if targetremote != remotename:
+            raise Exception("Current branch must track some %s branch." % targetremote)
+        log.debug("Good remote: %s", remotename)
+        with planning(historypath, _units(info, config.upload)), TemporaryDirectory() as tempdir:
+            copydir = os.path.join(tempdir, os.path.basename(os.path.abspath(info.projectdir)))
+            log.info("Copying project to: %s", copydir)
+            with unit('copy[*]'):
+                shutil.copytree(info.projectdir, copydir)
+            for relpath in release(config, git, ProjectInfo.seek(copydir), os.path.join(info.projectdir, 'var', 'release.json')):
+                log.info("Replace artifact: %s", relpath)
+                destpath = os.path.join(info.projectdir, relpath)
+                try:
+                    os.makedirs(os.path.dirname(destpath))
+                except OSError:
+                    pass
+                shutil.copy2(os.path.join(copydir, relpath), destpath)
+
+def _units(info, upload):
+    units = [Unit('copy[*]')]
+    units.extend(u.shifted(1) for u in EveryVersion(info, False, False, [], False, True).units())
+    units.append(Unit('warmups[*]', 4))
+    if SourceInfo(info.projectdir).extpaths:
+        units.extend(Unit("makewheels[%s]" % image.plat, 5, i, note = image.imagetag) for i, image in enumerate(_images()))
+        units.append(Unit('setup[sdist]', 6))
+    else:
+        units.append(Unit('setup[bdist_wheel,sdist]', 6))
+    if upload:
+        units.append(Unit('upload[*]', 7))
+    return units
 
 def uploadableartifacts(artifactrelpaths):
     def acceptplatform(platform):
@@ -142,7 +174,7 @@ def _warmups(info):
     warmups = [w.split(':') for w in info.config.warmups]
     if warmups:
         # XXX: Use the same transient venv as used for running tests?
-        with InstallDeps(info, False, None) as installdeps, Pool(next(iter(info.config.pyversions))).readonlyortransient[True](installdeps) as venv:
+        with InstallDeps(info, False, None) as installdeps, ClonePool(next(iter(info.config.pyversions))).readonlyortransient[True](installdeps) as venv:
             for m, f in warmups:
                 with NamedTemporaryFile('w', suffix = dotpy, dir = info.projectdir) as script:
                     script.write("from %s import %s\n%s()" % (m, f.split('.')[0], f))
@@ -153,10 +185,46 @@ def _runsetup(info, commands):
     with Pool(next(iter(info.config.pyversions))).readonly(SimpleInstallDeps(allbuildrequires(info))) as venv:
         venv.run('check_call', ['.'], 'setup', commands, cwd = info.projectdir) # XXX: Should venvpool automatically include current dir?
 
-def release(config, srcgit, info):
+def _loadpending(pendingpath):
+    try:
+        with open(pendingpath) as f:
+            return json.load(f)
+    except (IOError, ValueError):
+        pass
+
+def _savepending(pendingpath, pending):
+    os.makedirs(os.path.dirname(pendingpath), exist_ok = True)
+    with open(pendingpath + '.part', 'w') as f:
+        json.dump(pending, f)
+    os.replace(pendingpath + '.part', pendingpath)
+
+def _upload(config, info, artifactrelpaths):
+    transfer = config.transfer
+    with config.token as token:
+        def uploadfile(relpath):
+            Program.text(sys.executable)._m.twine.upload('--repository-url', config.repository.url, '-u', '__token__', '-p', token, relpath, cwd = info.projectdir, stdout = None, env = Pip.envpatch)
+        Uploader(uploadfile, transfer.jobs, transfer.retries, float(transfer.backoff)).uploadall(list(uploadableartifacts(artifactrelpaths)), existingfiles(config.index.url, info.config.name))
+
+def _makewheels(store, key, image, info):
+    distpath = os.path.join(info.projectdir, distrelpath)
+    if store.trusted and store.gettree(key, distpath):
+        return
+    before = set(os.listdir(distpath)) if os.path.exists(distpath) else set()
+    image.makewheels(info)
+    made = sorted(set(os.listdir(distpath)) - before) if os.path.exists(distpath) else []
+    if made:
+        store.puttree(key, distpath, made)
+
+def release(config, srcgit, info, pendingpath):
     scrub = lagoon.git.clean._xdi[partial](cwd = info.projectdir, input = 'c', stdout = None)
     scrub()
-    version = info.nextversion()
+    commit = srcgit.rev_parse.HEAD().rstrip()
+    pending = _loadpending(pendingpath)
+    if pending is not None and pending['commit'] == commit:
+        version = pending['version']
+        log.info("Resume release: %s", version)
+    else:
+        version = info.nextversion(config.index.url)
     pipify(info, version)
     EveryVersion(info, False, False, [], False, True).allchecks()
     scrub()
@@ -166,23 +234,31 @@ def release(config, srcgit, info):
                 path = os.path.join(dirpath, name)
                 log.debug("Delete: %s", path)
                 (os.remove if name.endswith('.py') else shutil.rmtree)(path)
-    _warmups(info)
+    with unit('warmups[*]'):
+        _warmups(info)
     pipify(info, version)
     shutil.rmtree(os.path.join(info.projectdir, '.git'))
     setupcommands = []
     if SourceInfo(info.projectdir).extpaths:
+        store = openstore(info.config)
         for image in _images():
-            image.makewheels(info)
+            with unit("makewheels[%s]" % image.plat):
+                _makewheels(store, fingerprint('makewheels', commit, version, image.plat, image.imagetag, *info.config.pyversions), image, info)
     else:
         setupcommands.append('bdist_wheel')
-    _runsetup(info, setupcommands + ['sdist'])
+    setupcommands.append('sdist')
+    with unit("setup[%s]" % ','.join(setupcommands)):
+        _runsetup(info, setupcommands)
     artifactrelpaths = [os.path.join(distrelpath, name) for name in sorted(os.listdir(os.path.join(info.projectdir, distrelpath)))]
     if config.upload:
-        srcgit.tag("v%s" % version, stdout = None)
-        # TODO LATER: If tag succeeded but push fails, we're left with a bogus tag.
-        srcgit.push.__tags(stdout = None) # XXX: Also update other remotes?
-        with config.token as token:
-            Program.text(sys.executable)._m.twine.upload('-u', '__token__', '-p', token, *uploadableartifacts(artifactrelpaths), cwd = info.projectdir, stdout = None, env = Pip.envpatch)
+        _savepending(pendingpath, dict(commit = commit, version = version)) # Until the tag is pushed, a rerun resumes this version.
+        with unit('upload[*]'):
+            _upload(config, info, artifactrelpaths)
+        tag = "v%s" % version
+        if not srcgit.tag._l(tag).strip():
+            srcgit.tag(tag, commit, stdout = None)
+        srcgit.push(targetremote, "refs/tags/%s" % tag, stdout = None) # XXX: Also update other remotes?
+        os.remove(pendingpath)
     else:
         log.warning("Upload skipped, use --upload to upload: %s", ' '.join(uploadableartifacts(artifactrelpaths)))
     return artifactrelpaths
@@ -35,6 +35,17 @@ class SourceInfo:
                 exec(f.read(), g)
             return g['make_ext'](self.module, self.path)
 
+    @classmethod
+    def static(cls, rootdir, packages, extmodules):
+        import os
+        if not all(os.path.exists(os.path.join(rootdir, p)) for p in [p.replace('.', os.sep) for p in packages] + [p for _, p in extmodules]):
+            return cls(rootdir) # Files have moved since pipify, or this is an unpacked sdist without them.
+        # Otherwise trust pipify, rerun it to pick up new packages or extensions.
+        self = cls.__new__(cls)
+        self.packages = packages
+        self.extpaths = [cls.PYXPath(m, p) for m, p in extmodules]
+        return self
+
     def __init__(self, rootdir):
         import os, setuptools, subprocess
         self.packages = setuptools.find_packages(rootdir)
@@ -0,0 +1,224 @@
+# Copyright 2013, 2014, 2015, 2016, 2017, 2020, 2022 Andrzej Cichocki
+
+# This file is part of pyven.
+#
+# pyven is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyven is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyven.  If not, see <http://www.gnu.org/licenses/>.
+
+from .util import cachedir, formatsize, parsesize
+from io import BytesIO
+from urllib.error import HTTPError, URLError
+from urllib.request import Request, urlopen
+import hashlib, logging, os, stat, tarfile, tempfile
+
+log = logging.getLogger(__name__)
+
+class IntegrityException(Exception): pass
+
+def fingerprint(*parts):
+    h = hashlib.sha256()
+    for part in parts:
+        if not isinstance(part, bytes):
+            part = str(part).encode()
+        h.update(("%s:" % len(part)).encode())
+        h.update(part)
+    return h.hexdigest()
+
+def fileparts(root, paths):
+    for path in sorted(paths):
+        with open(path, 'rb') as f:
+            data = f.read()
+        yield os.path.relpath(path, root)
+        yield stat.S_IMODE(os.stat(path).st_mode) & 0o111
+        yield data
+
+def _seal(data):
+    return hashlib.sha256(data).hexdigest().encode() + b'\n' + data
+
+def _unseal(blob):
+    digest, data = blob.split(b'\n', 1)
+    if hashlib.sha256(data).hexdigest().encode() != digest:
+        raise IntegrityException
+    return data
+
+class Store:
+
+    trusted = True # Whether content can be published without rebuilding.
+
+    def get(self, key):
+        blob = self._getblob(key)
+        if blob is not None:
+            try:
+                return _unseal(blob)
+            except (IntegrityException, ValueError):
+                log.warning("Discard corrupt artifact: %s", key)
+                self._discard(key)
+
+    def put(self, key, data):
+        self._putblob(key, _seal(data))
+
+    def gettree(self, key, dirpath):
+        data = self.get(key)
+        if data is None:
+            return False
+        with tarfile.open(fileobj = BytesIO(data)) as tar:
+            members = tar.getmembers()
+            for m in members:
+                if os.path.isabs(m.name) or '..' in m.name.split('/') or not (m.isfile() or m.isdir()):
+                    raise IntegrityException(m.name)
+            tar.extractall(dirpath, members)
+        log.info("Reuse %s artifact(s) from store: %s", len(members), key)
+        return True
+
+    def puttree(self, key, dirpath, relpaths):
+        f = BytesIO()
+        with tarfile.open(fileobj = f, mode = 'w') as tar:
+            for relpath in relpaths:
+                tar.add(os.path.join(dirpath, relpath), relpath)
+        self.put(key, f.getvalue())
+
+class NullStore(Store):
+
+    def _getblob(self, key):
+        pass
+
+    def _putblob(self, key, blob):
+        pass
+
+    def _discard(self, key):
+        pass
+
+class LocalStore(Store):
+
+    def __init__(self, root, quota = None):
+        self.root = root
+        self.quota = quota
+        self.total = None # Scanned at most once per instance, then kept up to date.
+
+    def _path(self, key):
+        return os.path.join(self.root, key[:2], key)
+
+    def _getblob(self, key):
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                blob = f.read()
+        except FileNotFoundError:
+            return
+        os.utime(path)
+        return blob
+
+    def _putblob(self, key, blob):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok = True)
+        oldsize = self._size(path)
+        fd, partpath = tempfile.mkstemp(dir = os.path.dirname(path), prefix = '.')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(blob)
+        os.replace(partpath, path)
+        if self.quota is not None:
+            if self.total is None:
+                self.evict(self.quota)
+            else:
+                self.total += len(blob) - oldsize
+                if self.total > self.quota:
+                    self.evict(self.quota)
+
+    def _discard(self, key):
+        path = self._path(key)
+        size = self._size(path)
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            return
+        if self.total is not None:
+            self.total -= size
+
+    @staticmethod
+    def _size(path):
+        try:
+            return os.stat(path).st_size
+        except FileNotFoundError:
+            return 0
+
+    def entries(self):
+        entries = []
+        if os.path.isdir(self.root):
+            for dirpath, _, filenames in os.walk(self.root):
+                for name in filenames:
+                    if name.startswith('.'):
+                        continue # Partial write.
+                    path = os.path.join(dirpath, name)
+                    try:
+                        st = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    entries.append((st.st_mtime, st.st_size, path))
+        return sorted(entries)
+
+    def evict(self, quota):
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        freed = 0
+        for _, size, path in entries:
+            if total - freed <= quota:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            freed += size
+        if freed:
+            log.info("Evicted %s from store, quota %s.", formatsize(freed), formatsize(quota))
+        self.total = total - freed
+        return freed
+
+class HTTPStore(Store):
+
+    timeout = 30
+    trusted = False
+
+    def __init__(self, url):
+        self.url = url.rstrip('/')
+
+    def _getblob(self, key):
+        try:
+            with urlopen("%s/%s" % (self.url, key), timeout = self.timeout) as f:
+                return f.read()
+        except HTTPError as e:
+            if 404 != e.code:
+                log.warning("Store get failed: %s", e)
+        except (URLError, OSError) as e:
+            log.warning("Store unavailable: %s", e)
+
+    def _putblob(self, key, blob):
+        try:
+            urlopen(Request("%s/%s" % (self.url, key), data = blob, method = 'PUT', headers = {'Content-Type': 'application/octet-stream'}), timeout = self.timeout).close()
+        except (URLError, OSError) as e:
+            log.warning("Store put failed: %s", e)
+
+    def _discard(self, key):
+        try:
+            urlopen(Request("%s/%s" % (self.url, key), method = 'DELETE'), timeout = self.timeout).close()
+        except (URLError, OSError):
+            pass
+
+def openstore(config):
+    backend = config.store.backend
+    if 'local' == backend:
+        return LocalStore(os.path.join(cachedir, 'store'), parsesize(config.store.quota))
+    if 'http' == backend:
+        return HTTPStore(config.store.url)
+    if 'off' == backend:
+        return NullStore()
+    raise Exception("Unknown store backend: %s" % backend)
@@ -16,21 +16,88 @@
 # along with pyven.  If not, see <http://www.gnu.org/licenses/>.
 
 'Show all XX''X/TO''DO/FIX''ME comments in project.'
+from .daemon import daemonable
 from .files import Files
+from .util import ThreadPoolExecutor
 from argparse import ArgumentParser
-import subprocess
+from collections import defaultdict
+import json, os, re, subprocess
 
+tags = 'XX''X', 'TO''DO', 'FIX''ME'
+cacherelpath = os.path.join('var', 'tasks.json')
+tagmatches = re.compile("(%s)( LATER)?" % '|'.join(tags)).finditer
+
+def scan(path):
+    with open(path, 'rb') as f:
+        text = f.read().decode('utf_8', 'replace')
+    hits = []
+    for lineno, line in enumerate(text.splitlines(), 1):
+        for key in sorted({(m.group(1), m.group(2) is not None) for m in tagmatches(line)}):
+            hits.append([lineno, key[0], key[1], line])
+    return hits
+
+class Scanner:
+
+    def __init__(self, root, cachepath = None):
+        self.root = root
+        self.cachepath = cachepath
+
+    def _stamp(self, relpath):
+        st = os.stat(os.path.join(self.root, relpath))
+        return [st.st_mtime_ns, st.st_size]
+
+    def scanall(self, relpaths):
+        cache = {}
+        if self.cachepath is not None and os.path.exists(self.cachepath):
+            with open(self.cachepath) as f:
+                cache = json.load(f)
+        results = {}
+        with ThreadPoolExecutor() as executor:
+            futures = {}
+            for relpath in relpaths:
+                stamp = self._stamp(relpath)
+                entry = cache.get(relpath)
+                if entry is not None and entry['stamp'] == stamp:
+                    results[relpath] = entry
+                else:
+                    futures[relpath] = stamp, executor.submit(scan, os.path.join(self.root, relpath))
+            for relpath, (stamp, future) in futures.items():
+                results[relpath] = dict(stamp = stamp, hits = future.result())
+        if self.cachepath is not None:
+            os.makedirs(os.path.dirname(self.cachepath), exist_ok = True)
+            with open(self.cachepath, 'w') as f:
+                json.dump(results, f)
+        return [[relpath, results[relpath]['hits']] for relpath in relpaths]
+
+def groupbykind(scanned, wanttags):
+    groups = defaultdict(list)
+    for relpath, hits in scanned:
+        for lineno, tag, later, line in hits:
+            groups[tag, later].append([relpath, lineno, line])
+    return [[tag, later, groups[tag, later]] for tag in wanttags for later in [True, False]]
+
+@daemonable
 def main():
     parser = ArgumentParser()
     parser.add_argument('-q', action = 'count', default = 0)
+    parser.add_argument('--json', action = 'store_true', help = 'print matches and per-tag counts as JSON')
+    parser.add_argument('--incremental', action = 'store_true', help = "only rescan files changed since last run, cache in %s" % cacherelpath)
     config = parser.parse_args()
     root, = subprocess.check_output(['git', 'rev-parse', '--show-toplevel']).decode().splitlines()
-    agcommand = ['ag', '--noheading', '--nobreak']
     # XXX: Integrate with declared project resource types?
     paths = list(Files.relpaths(root, ['.py', '.pyx', '.h', '.cpp', '.ui', '.java', '.kt', '.c', '.s', '.sh', '.arid', '.aridt', '.gradle', '.java', '.mk'], ['Dockerfile', 'Makefile']))
-    for tag in ['XX''X', 'TO''DO', 'FIX''ME'][config.q:]:
-        subprocess.call(agcommand + [tag + ' LATER'] + paths, cwd = root)
-        subprocess.call(agcommand + [tag + '(?! LATER)'] + paths, cwd = root)
+    groups = groupbykind(Scanner(root, os.path.join(root, cacherelpath) if config.incremental else None).scanall(paths), tags[config.q:])
+    if config.json:
+        counts = defaultdict(int)
+        matches = []
+        for tag, later, entries in groups:
+            counts[tag] += len(entries)
+            matches.extend(dict(path = p, line = n, tag = tag, later = later, text = l) for p, n, l in entries)
+        print(json.dumps(dict(counts = counts, matches = matches), indent = 2))
+    else:
+        for _, _, entries in groups:
+            for p, n, l in entries:
+                print("%s:%s:%s" % (p, n, l))
 
 if '__main__' == __name__:
     main()
@@ -0,0 +1,100 @@
+# Copyright 2013, 2014, 2015, 2016, 2017, 2020, 2022 Andrzej Cichocki
+
+# This file is part of pyven.
+#
+# pyven is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyven is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyven.  If not, see <http://www.gnu.org/licenses/>.
+
+from . import daemon
+from .daemon import RelpathsCache
+from importlib import import_module
+from itertools import chain
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+import os, subprocess, sys, time
+
+class TestDaemon(TestCase):
+
+    def test_nodaemon(self):
+        with TemporaryDirectory() as tempdir:
+            socketpath = daemon.socketpath
+            daemon.socketpath = os.path.join(tempdir, 'pyven.sock')
+            try:
+                self.assertIsNone(daemon._delegate('pyven.tasks'))
+            finally:
+                daemon.socketpath = socketpath
+
+    def test_relpathscache(self):
+        calls = []
+        def relpaths(root, suffixes, prefixes, excludeglobs):
+            calls.append(root)
+            return sorted(os.path.relpath(os.path.join(d, n), root) for d, _, names in os.walk(root) for n in names if n.endswith('.py'))
+        with TemporaryDirectory() as root:
+            path = os.path.join(root, 'a.py')
+            with open(path, 'w'):
+                pass
+            cache = RelpathsCache()
+            get = lambda: cache.get(relpaths, root, ['.py'], [], [])
+            self.assertEqual(['a.py'], get())
+            with open(path, 'w') as f:
+                f.write('edit')
+            cache.refresh()
+            self.assertEqual(['a.py'], get())
+            self.assertEqual(1, len(calls))
+            with open(os.path.join(root, 'b.py'), 'w'):
+                pass
+            cache.refresh()
+            self.assertEqual(['a.py', 'b.py'], get())
+            self.assertEqual(2, len(calls))
+            os.makedirs(os.path.join(root, 'x', 'y'))
+            cache.refresh()
+            get()
+            with open(os.path.join(root, 'x', 'y', 'c.py'), 'w'):
+                pass
+            cache.refresh()
+            self.assertEqual(['a.py', 'b.py', 'x/y/c.py'], get())
+            with open(os.path.join(root, 'x', 'y', 'd.txt'), 'w'):
+                pass
+            cache.refresh()
+            get()
+            self.assertEqual(4, len(calls))
+
+    def test_entrypoint(self):
+        try:
+            import_module('.projectinfo', __package__) # The daemon loads this up front.
+        except ImportError as e:
+            self.skipTest("Daemon dependencies not importable: %s" % e)
+        with TemporaryDirectory() as tempdir:
+            env = dict(os.environ, XDG_RUNTIME_DIR = tempdir, PYTHONPATH = os.pathsep.join(chain([os.path.dirname(os.path.dirname(daemon.__file__))], filter(None, [os.environ.get('PYTHONPATH')]))))
+            env.pop(daemon.disableenv, None)
+            server = subprocess.Popen([sys.executable, '-m', 'pyven.daemon'], env = env, stderr = subprocess.DEVNULL)
+            try:
+                socketpath = os.path.join(tempdir, 'pyven.sock')
+                for _ in range(100):
+                    if os.path.exists(socketpath) or server.poll() is not None:
+                        break
+                    time.sleep(.1)
+                self.assertIsNone(server.poll())
+                self.assertTrue(os.path.exists(socketpath))
+                self.assertEqual(0, os.stat(socketpath).st_mode & 0o077)
+                delegate = "import sys; from pyven import daemon; sys.argv[1:] = [%r]; print(daemon._delegate(%r))"
+                client = subprocess.run([sys.executable, '-c', delegate % ('--help', 'pyven.tasks')], env = env, stdout = subprocess.PIPE, timeout = 10, check = True)
+                usage, status = client.stdout.decode().rsplit('\n', 2)[:2] # Usage from the daemon's child, then its status.
+                self.assertIn('--incremental', usage)
+                self.assertEqual('0', status)
+                client = subprocess.run([sys.executable, '-c', delegate % ('x', 'os')], env = env, stdout = subprocess.PIPE, stderr = subprocess.PIPE, timeout = 10, check = True)
+                self.assertEqual(b'1\n', client.stdout)
+                self.assertIn(b'Not a daemon command: os', client.stderr)
+            finally:
+                server.terminate()
+                server.wait(10)
@@ -0,0 +1,46 @@
+# Copyright 2013, 2014, 2015, 2016, 2017, 2020, 2022 Andrzej Cichocki
+
+# This file is part of pyven.
+#
+# pyven is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyven is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyven.  If not, see <http://www.gnu.org/licenses/>.
+
+from .diffcov import changedlines, diffcoverage
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+import json, os, subprocess
+
+class TestDiffCov(TestCase):
+
+    def test_works(self):
+        with TemporaryDirectory() as root:
+            git = lambda *args: subprocess.check_output(['git', '-c', 'user.name=x', '-c', 'user.email=x', *args], cwd = root).decode()
+            def write(name, text):
+                with open(os.path.join(root, name), 'w') as f:
+                    f.write(text)
+            git('init', '-q')
+            write('a.py', 'x = 1\ny = 2\n')
+            git('add', 'a.py')
+            git('commit', '-qm', 'init')
+            commit = git('rev-parse', 'HEAD').strip()
+            write('a.py', 'x = 1\ny = 3\nz = 4\n')
+            write('b.py', 'w = 5\n')
+            changed = changedlines(root, commit)
+            self.assertEqual({'a.py': {2, 3}, 'b.py': None}, changed)
+            reportpath = os.path.join(root, 'coverage.json')
+            with open(reportpath, 'w') as f:
+                json.dump(dict(files = {
+                    os.path.join(root, 'a.py'): dict(executed_lines = [1, 2], missing_lines = [3]),
+                    'b.py': dict(executed_lines = [1], missing_lines = []),
+                }), f)
+            self.assertEqual({'a.py': (1, 2, [3]), 'b.py': (1, 1, [])}, dict(diffcoverage(root, reportpath, changed)))
@@ -0,0 +1,72 @@
+# Copyright 2013, 2014, 2015, 2016, 2017, 2020, 2022 Andrzej Cichocki
+
+# This file is part of pyven.
+#
+# pyven is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyven is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyven.  If not, see <http://www.gnu.org/licenses/>.
+
+from .files import Files
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+import os
+
+report = '''<?xml version="1.0" encoding="UTF-8"?>
+<testsuite name="nosetests" tests="3" errors="0" failures="1" skip="0">
+<testcase classname="pkg.test_slow.TestSlow" name="test_a" time="5.0"></testcase>
+<testcase classname="pkg.test_fast.TestFast" name="test_b" time="0.1"></testcase>
+<testcase classname="pkg.test_broken.TestBroken" name="test_c" time="2.0"><failure type="AssertionError" message="no">no</failure></testcase>
+</testsuite>
+'''
+
+pytestreport = '''<?xml version="1.0" encoding="utf-8"?>
+<testsuites><testsuite name="pytest" errors="0" failures="1" skipped="0" tests="3" time="3.2">
+<testcase classname="pkg.test_slow" name="test_a" time="3.0" />
+<testcase classname="pkg.test_fast.TestFast" name="test_b" time="0.1" />
+<testcase classname="pkg.test_broken" name="test_c" time="0.2"><failure message="no">no</failure></testcase>
+</testsuite></testsuites>
+'''
+
+class TestFiles(TestCase):
+
+    def test_failurefirst(self):
+        with TemporaryDirectory() as root:
+            files = Files.__new__(Files)
+            files.root = root
+            files.pypaths = [os.path.join(root, 'pkg', "test_%s.py" % n) for n in ['broken', 'fast', 'slow', 'new']]
+            reportpath = os.path.join(root, 'nosetests.xml')
+            with open(reportpath, 'w') as f:
+                f.write(report)
+            names = lambda: [os.path.basename(p) for p in files.testpaths(reportpath)]
+            self.assertEqual(['test_fast.py', 'test_broken.py', 'test_slow.py', 'test_new.py'], names())
+            files.recordhistory(reportpath)
+            self.assertEqual(['test_broken.py', 'test_fast.py', 'test_slow.py', 'test_new.py'], names())
+            with open(reportpath, 'w') as f:
+                f.write(report.replace('<failure type="AssertionError" message="no">no</failure>', ''))
+            files.recordhistory(reportpath)
+            self.assertEqual(['test_broken.py', 'test_fast.py', 'test_slow.py', 'test_new.py'], names()) # Still in recent history.
+            for _ in range(Files.historylen):
+                files.recordhistory(reportpath)
+            self.assertEqual(['test_fast.py', 'test_broken.py', 'test_slow.py', 'test_new.py'], names())
+
+    def test_pytestreport(self):
+        with TemporaryDirectory() as root:
+            files = Files.__new__(Files)
+            files.root = root
+            files.pypaths = [os.path.join(root, 'pkg', "test_%s.py" % n) for n in ['broken', 'fast', 'slow', 'new']]
+            reportpath = os.path.join(root, 'junit.xml')
+            with open(reportpath, 'w') as f:
+                f.write(pytestreport)
+            names = lambda: [os.path.basename(p) for p in files.testpaths(reportpath)]
+            self.assertEqual(['test_fast.py', 'test_broken.py', 'test_slow.py', 'test_new.py'], names())
+            files.recordhistory(reportpath)
+            self.assertEqual(['test_broken.py', 'test_fast.py', 'test_slow.py', 'test_new.py'], names())
@@ -0,0 +1,80 @@
+# Copyright 2013, 2014, 2015, 2016, 2017, 2020, 2022 Andrzej Cichocki
+
+# This file is part of pyven.
+#
+# pyven is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyven is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyven.  If not, see <http://www.gnu.org/licenses/>.
+
+from .github import OfflineException, RepoMetadata
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from tempfile import TemporaryDirectory
+from threading import Thread
+from unittest import TestCase
+import json
+
+class Handler(BaseHTTPRequestHandler):
+
+    etag = '"v1"'
+
+    def do_GET(self):
+        self.server.requests.append([self.path, self.headers.get('If-None-Match')])
+        if self.server.ratelimited:
+            self.server.ratelimited = False
+            self.send_response(403)
+            self.send_header('X-RateLimit-Reset', '0')
+            self.end_headers()
+        elif self.etag == self.headers.get('If-None-Match'):
+            self.send_response(304)
+            self.end_headers()
+        else:
+            body = json.dumps(dict(description = 'Woo')).encode()
+            self.send_response(200)
+            self.send_header('ETag', self.etag)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+class TestRepoMetadata(TestCase):
+
+    def setUp(self):
+        self.server = HTTPServer(('127.0.0.1', 0), Handler)
+        self.server.requests = []
+        self.server.ratelimited = False
+        Thread(target = self.server.serve_forever, daemon = True).start()
+        self.apiurl = "http://127.0.0.1:%s" % self.server.server_port
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_cache(self):
+        with TemporaryDirectory() as cachedir:
+            with self.assertRaises(OfflineException):
+                RepoMetadata(self.apiurl, cachedir, 3600, True).get('a/b')
+            self.assertEqual('Woo', RepoMetadata(self.apiurl, cachedir, 3600, False).get('a/b')['description'])
+            self.assertEqual('Woo', RepoMetadata(self.apiurl, cachedir, 3600, False).get('a/b')['description'])
+            self.assertEqual('Woo', RepoMetadata(self.apiurl, cachedir, 3600, True).get('a/b')['description'])
+            self.assertEqual([['/repos/a/b', None]], self.server.requests)
+            self.assertEqual('Woo', RepoMetadata(self.apiurl, cachedir, 0, False).get('a/b')['description'])
+            self.assertEqual([['/repos/a/b', None], ['/repos/a/b', '"v1"']], self.server.requests)
+
+    def test_ratelimit(self):
+        self.server.ratelimited = True
+        with TemporaryDirectory() as cachedir:
+            metadata = RepoMetadata(self.apiurl, cachedir, 3600, False)
+            metadata.defaultdelay = None # Must not be used.
+            self.assertEqual('Woo', metadata.get('a/b')['description'])
+        self.assertEqual(2, len(self.server.requests))
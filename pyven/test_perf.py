@@ -0,0 +1,45 @@
+# Copyright 2013, 2014, 2015, 2016, 2017, 2020, 2022 Andrzej Cichocki
+
+# This file is part of pyven.
+#
+# pyven is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyven is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyven.  If not, see <http://www.gnu.org/licenses/>.
+
+from .perf import DurationHistory
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+import os
+
+class TestDurationHistory(TestCase):
+
+    def test_regressions(self):
+        with TemporaryDirectory() as tempdir:
+            history = DurationHistory(os.path.join(tempdir, 'durations.tsv'), 3)
+            self.assertEqual([], list(history.regressions(dict(a = 1), .5, .05)))
+            for a in 1, 1.2, .9:
+                history.record(dict(a = a, b = .01))
+            self.assertEqual([], list(history.regressions(dict(a = 1.4, b = .05, c = 9), .5, .05)))
+            self.assertEqual([('a', 1, 1.6)], list(history.regressions(dict(a = 1.6, b = .05), .5, .05)))
+            self.assertEqual([('b', .01, .1)], list(history.regressions(dict(a = 1, b = .1), .5, .05)))
+
+    def test_compaction(self):
+        with TemporaryDirectory() as tempdir:
+            path = os.path.join(tempdir, 'durations.tsv')
+            history = DurationHistory(path, 2)
+            for i in range(7):
+                history.record(dict(a = i))
+                with open(path) as f:
+                    runs = [int(l.split('\t')[0]) for l in f]
+                self.assertTrue(len(runs) <= 4)
+                self.assertEqual(i, runs[-1])
+            self.assertEqual([('a', 5.5, 9)], list(history.regressions(dict(a = 9), .5, .05)))
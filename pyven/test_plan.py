@@ -0,0 +1,50 @@
+# Copyright 2013, 2014, 2015, 2016, 2017, 2020, 2022 Andrzej Cichocki
+
+# This file is part of pyven.
+#
+# pyven is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyven is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyven.  If not, see <http://www.gnu.org/licenses/>.
+
+from . import plan
+from .plan import PhaseHistory, Plan, planning, Unit, unit
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+import os
+
+class TestPlan(TestCase):
+
+    def test_estimates(self):
+        with TemporaryDirectory() as tempdir:
+            history = PhaseHistory(os.path.join(tempdir, 'phases.json'))
+            for seconds in 1, 3, 2:
+                history.record('a', seconds)
+            history.record('b', 4)
+            history.record('c', 5)
+            p = Plan([Unit('a'), Unit('b', 1, 0), Unit('c', 1, 1), Unit('d', 2, fallback = 6), Unit('e', 2)], history)
+            self.assertEqual(2, p.estimates['a'])
+            self.assertIsNone(p.estimates['e'])
+            self.assertEqual(17, p.serial())
+            self.assertEqual(13, p.parallel())
+
+    def test_planning(self):
+        with TemporaryDirectory() as tempdir:
+            path = os.path.join(tempdir, 'var', 'phases.json')
+            with planning(path, [Unit('x')]):
+                with unit('x'):
+                    pass
+                with self.assertRaises(ValueError), unit('y'):
+                    raise ValueError
+            self.assertIsNone(plan.current)
+            history = PhaseHistory(path)
+            self.assertEqual(1, len(history.durations['x']))
+            self.assertNotIn('y', history.durations)
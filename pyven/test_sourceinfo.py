@@ -0,0 +1,36 @@
+# Copyright 2013, 2014, 2015, 2016, 2017, 2020, 2022 Andrzej Cichocki
+
+# This file is part of pyven.
+#
+# pyven is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyven is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyven.  If not, see <http://www.gnu.org/licenses/>.
+
+from .sourceinfo import SourceInfo
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+import os
+
+class TestSourceInfo(TestCase):
+
+    def test_static(self):
+        with TemporaryDirectory() as tempdir:
+            os.mkdir(os.path.join(tempdir, 'pkg'))
+            for name in os.path.join('pkg', '__init__.py'), os.path.join('pkg', 'fast.pyx'):
+                with open(os.path.join(tempdir, name), 'w'):
+                    pass
+            info = SourceInfo.static(tempdir, ['pkg'], [['pkg.fast', os.path.join('pkg', 'fast.pyx')]])
+            self.assertEqual(['pkg'], info.packages)
+            self.assertEqual([['pkg.fast', os.path.join('pkg', 'fast.pyx')]], [[p.module, p.path] for p in info.extpaths])
+            info = SourceInfo.static(tempdir, ['pkg', 'gone'], [])
+            self.assertEqual(['pkg'], info.packages)
+            self.assertEqual(['pkg.fast'], [p.module for p in info.extpaths])
@@ -0,0 +1,123 @@
+# Copyright 2013, 2014, 2015, 2016, 2017, 2020, 2022 Andrzej Cichocki
+
+# This file is part of pyven.
+#
+# pyven is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyven is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyven.  If not, see <http://www.gnu.org/licenses/>.
+
+from .store import fingerprint, HTTPStore, LocalStore
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from tempfile import TemporaryDirectory
+from threading import Thread
+from unittest import TestCase
+import os
+
+class Handler(BaseHTTPRequestHandler):
+
+    blobs = {}
+
+    def do_GET(self):
+        blob = self.blobs.get(self.path)
+        if blob is None:
+            self.send_response(404)
+            self.end_headers()
+        else:
+            self.send_response(200)
+            self.send_header('Content-Length', str(len(blob)))
+            self.end_headers()
+            self.wfile.write(blob)
+
+    def do_PUT(self):
+        self.blobs[self.path] = self.rfile.read(int(self.headers['Content-Length']))
+        self.send_response(201)
+        self.end_headers()
+
+    def do_DELETE(self):
+        self.blobs.pop(self.path, None)
+        self.send_response(204)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+class TestStore(TestCase):
+
+    def test_fingerprint(self):
+        self.assertEqual(fingerprint('a', 'bc'), fingerprint(b'a', 'bc'))
+        self.assertNotEqual(fingerprint('a', 'bc'), fingerprint('ab', 'c'))
+
+    def test_local(self):
+        with TemporaryDirectory() as tempdir:
+            store = LocalStore(os.path.join(tempdir, 'store'))
+            key = fingerprint('x')
+            self.assertIsNone(store.get(key))
+            store.put(key, b'woo')
+            self.assertEqual(b'woo', store.get(key))
+            path = store._path(key)
+            with open(path, 'r+b') as f:
+                f.seek(-1, os.SEEK_END)
+                f.write(b'x')
+            self.assertIsNone(store.get(key))
+            self.assertFalse(os.path.exists(path))
+
+    def test_evict(self):
+        with TemporaryDirectory() as tempdir:
+            store = LocalStore(tempdir)
+            keys = [fingerprint(i) for i in range(3)]
+            for i, key in enumerate(keys):
+                store.put(key, b'x' * 100)
+                os.utime(store._path(key), (i, i))
+            store.get(keys[0])
+            store.evict(350)
+            self.assertEqual([b'x' * 100, None, b'x' * 100], [store.get(k) for k in keys])
+
+    def test_quota(self):
+        with TemporaryDirectory() as tempdir:
+            store = LocalStore(tempdir, 1000)
+            scans = []
+            entries = store.entries
+            store.entries = lambda: scans.append(None) or entries()
+            for i in range(4):
+                store.put(fingerprint(i), b'x' * 100)
+            self.assertEqual(1, len(scans))
+            store.put(fingerprint('big'), b'x' * 500)
+            self.assertEqual(2, len(scans))
+            self.assertLessEqual(store.total, 1000)
+            self.assertEqual(store.total, sum(size for _, size, _ in entries()))
+
+    def test_tree(self):
+        with TemporaryDirectory() as src, TemporaryDirectory() as dest, TemporaryDirectory() as root:
+            with open(os.path.join(src, 'a.whl'), 'w') as f:
+                f.write('wheel')
+            store = LocalStore(root)
+            self.assertFalse(store.gettree('k', dest))
+            store.puttree('k', src, ['a.whl'])
+            self.assertTrue(store.gettree('k', dest))
+            with open(os.path.join(dest, 'a.whl')) as f:
+                self.assertEqual('wheel', f.read())
+
+    def test_http(self):
+        server = HTTPServer(('127.0.0.1', 0), Handler)
+        Thread(target = server.serve_forever, daemon = True).start()
+        try:
+            store = HTTPStore("http://127.0.0.1:%s/cas/" % server.server_port)
+            self.assertIsNone(store.get('k'))
+            store.put('k', b'woo')
+            self.assertEqual(b'woo', store.get('k'))
+            Handler.blobs['/cas/k'] = Handler.blobs['/cas/k'][:-1]
+            self.assertIsNone(store.get('k'))
+            self.assertNotIn('/cas/k', Handler.blobs)
+            self.assertIsNone(HTTPStore('http://127.0.0.1:1/').get('k'))
+        finally:
+            server.shutdown()
+            server.server_close()
@@ -0,0 +1,54 @@
+# Copyright 2013, 2014, 2015, 2016, 2017, 2020, 2022 Andrzej Cichocki
+
+# This file is part of pyven.
+#
+# pyven is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyven is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyven.  If not, see <http://www.gnu.org/licenses/>.
+
+from .tasks import groupbykind, Scanner, tags
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+import os
+
+class TestScanner(TestCase):
+
+    def test_scan(self):
+        x, t, f = tags
+        with TemporaryDirectory() as root:
+            with open(os.path.join(root, 'a.py'), 'w') as g:
+                g.write("# %s LATER: one\npass\n# %s: two %s three\n" % (t, x, t))
+            with open(os.path.join(root, 'b.py'), 'w') as g:
+                g.write("# %s LATER and %s\n" % (f, f))
+            scanned = Scanner(root).scanall(['a.py', 'b.py'])
+            self.assertEqual([
+                [x, True, []],
+                [x, False, [['a.py', 3, "# %s: two %s three" % (x, t)]]],
+                [t, True, [['a.py', 1, "# %s LATER: one" % t]]],
+                [t, False, [['a.py', 3, "# %s: two %s three" % (x, t)]]],
+                [f, True, [['b.py', 1, "# %s LATER and %s" % (f, f)]]],
+                [f, False, [['b.py', 1, "# %s LATER and %s" % (f, f)]]],
+            ], groupbykind(scanned, tags))
+            self.assertEqual([[t, True], [t, False]], [g[:2] for g in groupbykind(scanned, tags[1:2])])
+
+    def test_incremental(self):
+        x = tags[0]
+        with TemporaryDirectory() as root:
+            path = os.path.join(root, 'a.py')
+            cachepath = os.path.join(root, 'var', 'tasks.json')
+            with open(path, 'w') as g:
+                g.write("# %s\n" % x)
+            self.assertEqual([['a.py', [[1, x, False, "# %s" % x]]]], Scanner(root, cachepath).scanall(['a.py']))
+            self.assertTrue(os.path.exists(cachepath))
+            with open(path, 'w') as g:
+                g.write("\n\n# %s LATER\n" % x)
+            self.assertEqual([['a.py', [[3, x, True, "# %s LATER" % x]]]], Scanner(root, cachepath).scanall(['a.py']))
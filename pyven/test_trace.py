@@ -0,0 +1,47 @@
+# Copyright 2013, 2014, 2015, 2016, 2017, 2020, 2022 Andrzej Cichocki
+
+# This file is part of pyven.
+#
+# pyven is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyven is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyven.  If not, see <http://www.gnu.org/licenses/>.
+
+from . import trace
+from .trace import nospan, span, traced, tracing
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+import json, os, subprocess, sys
+
+class TestTrace(TestCase):
+
+    def test_disabled(self):
+        self.assertIs(nospan, span('x'))
+        self.assertEqual(3, traced('f')(lambda a, b: a + b)(1, 2))
+
+    def test_enabled(self):
+        @traced('add')
+        def add(a, b):
+            return a + b
+        with TemporaryDirectory() as tempdir:
+            path = os.path.join(tempdir, 'trace.json')
+            with tracing(path):
+                with span('outer', k = 'v'):
+                    self.assertEqual(3, add(1, 2))
+                    subprocess.check_call([sys.executable, '-c', ''])
+            self.assertIs(None, trace.tracer)
+            self.assertEqual('Popen', subprocess.Popen.__name__)
+            with open(path) as f:
+                events = json.load(f)['traceEvents']
+        self.assertEqual(['add', 'subprocess', 'outer'], [e['name'] for e in events])
+        self.assertEqual({'k': 'v'}, events[2]['args'])
+        self.assertEqual(0, events[1]['args']['returncode'])
+        self.assertTrue(all('X' == e['ph'] for e in events))
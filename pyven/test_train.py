@@ -0,0 +1,42 @@
+# Copyright 2013, 2014, 2015, 2016, 2017, 2020, 2022 Andrzej Cichocki
+
+# This file is part of pyven.
+#
+# pyven is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyven is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyven.  If not, see <http://www.gnu.org/licenses/>.
+
+from .train import CycleException, Progress, trainorder
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+import os
+
+class TestTrain(TestCase):
+
+    def test_order(self):
+        order = trainorder(dict(app = {'lib', 'util', 'pypionly'}, lib = {'util'}, util = set(), other = set()))
+        self.assertEqual(4, len(order))
+        self.assertLess(order.index('util'), order.index('lib'))
+        self.assertLess(order.index('lib'), order.index('app'))
+
+    def test_cycle(self):
+        with self.assertRaises(CycleException):
+            trainorder(dict(a = {'b'}, b = {'a'}))
+
+    def test_progress(self):
+        with TemporaryDirectory() as tempdir:
+            path = os.path.join(tempdir, 'train', 'x.json')
+            Progress(path).markdone('lib', 'abc')
+            progress = Progress(path)
+            self.assertTrue(progress.isdone('lib', 'abc'))
+            self.assertFalse(progress.isdone('lib', 'def'))
+            self.assertFalse(progress.isdone('app', 'abc'))
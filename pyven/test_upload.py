@@ -0,0 +1,74 @@
+# Copyright 2013, 2014, 2015, 2016, 2017, 2020, 2022 Andrzej Cichocki
+
+# This file is part of pyven.
+#
+# pyven is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyven is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyven.  If not, see <http://www.gnu.org/licenses/>.
+
+from .upload import existingfiles, Uploader, UploadFailedException
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from tempfile import TemporaryDirectory
+from threading import Thread
+from unittest import TestCase
+import os
+
+class Handler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        if '/simple/my-proj/' == self.path:
+            body = b'<html><body><a href="../../packages/my_proj-10.tar.gz#sha256=x">my_proj-10.tar.gz</a></body></html>'
+            self.send_response(200)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        else:
+            self.send_response(404)
+            self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+class TestUpload(TestCase):
+
+    def test_existingfiles(self):
+        server = HTTPServer(('127.0.0.1', 0), Handler)
+        Thread(target = server.serve_forever, daemon = True).start()
+        try:
+            indexurl = "http://127.0.0.1:%s/simple/" % server.server_port
+            self.assertEqual({'my_proj-10.tar.gz'}, existingfiles(indexurl, 'My_Proj'))
+            self.assertEqual(set(), existingfiles(indexurl, 'other'))
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    def test_uploadall(self):
+        attempts = []
+        def uploadfile(path):
+            attempts.append(os.path.basename(path))
+            if 'flaky' in path and attempts.count(os.path.basename(path)) < 2:
+                raise Exception('transient')
+            if 'broken' in path:
+                raise Exception('permanent')
+        with TemporaryDirectory() as tempdir:
+            paths = [os.path.join(tempdir, name) for name in ['done.whl', 'flaky.whl', 'ok.whl']]
+            for path in paths:
+                with open(path, 'w') as f:
+                    f.write('x')
+            Uploader(uploadfile, 2, 1, 0).uploadall(paths, {'done.whl'})
+            self.assertEqual(['flaky.whl', 'flaky.whl', 'ok.whl'], sorted(attempts))
+            brokenpath = os.path.join(tempdir, 'broken.whl')
+            with open(brokenpath, 'w') as f:
+                f.write('x')
+            with self.assertRaises(UploadFailedException) as cm:
+                Uploader(uploadfile, 2, 1, 0).uploadall([brokenpath], set())
+            self.assertEqual(([brokenpath],), cm.exception.args)
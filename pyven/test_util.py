@@ -15,7 +15,8 @@
 # You should have received a copy of the GNU General Public License
 # along with pyven.  If not, see <http://www.gnu.org/licenses/>.
 
-from .util import Excludes
+from .util import _indexreq, Excludes, formatsize, JobsFailedException, parsesize, runjobs
+from tempfile import TemporaryDirectory
 from unittest import TestCase
 import os
 
@@ -34,3 +35,58 @@ class TestUtil(TestCase):
             self.assertTrue(os.path.join(t, 'x') in e)
             self.assertTrue(os.path.join('a', t, 'x') in e)
             self.assertTrue(os.path.join('a', 'bb', t, 'x') in e)
+
+    def test_excludesmany(self):
+        e = Excludes(['contrib/*', 'x/vendor/*', 'vendor/*'])
+        for relpath in ['contrib', 'x', 'vendor', os.path.join('contrib', 'x', 'y.py'), os.path.join('a', 'x', 'vendor', 'y.py'), os.path.join('a', 'vendor', 'y.py')]:
+            self.assertFalse(relpath in e, relpath) # Every glob is anchored at both ends.
+        for relpath in [os.path.join('contrib', 'y.py'), os.path.join('x', 'vendor', 'y.py'), os.path.join('vendor', 'y.py')]:
+            self.assertTrue(relpath in e, relpath)
+
+    def test_excludesdirs(self):
+        e = Excludes(['**/contrib/*', 'vendor/**'])
+        self.assertTrue(e.mayexclude(''))
+        self.assertFalse(e.excludesall(''))
+        self.assertFalse(e.excludesall('contrib'))
+        self.assertFalse('vendor' in e)
+        self.assertTrue(os.path.join('vendor', 'x') in e)
+        self.assertTrue(os.path.join('vendor', 'a', 'x') in e)
+        self.assertTrue(e.excludesall('vendor'))
+        self.assertTrue(e.excludesall(os.path.join('vendor', 'a')))
+        e = Excludes(['a/*.py'])
+        self.assertTrue(e.mayexclude('a'))
+        self.assertFalse(e.mayexclude('b'))
+        self.assertFalse(e.mayexclude(os.path.join('a', 'b')))
+        self.assertFalse(Excludes([]).mayexclude(''))
+
+    def test_runjobs(self):
+        def fail(logfile):
+            logfile.write('before\n')
+            raise Exception('boom')
+        with TemporaryDirectory() as tempdir:
+            path = lambda name: os.path.join(tempdir, 'logs', name)
+            runjobs(2, [['a', path('a.log'), lambda logfile: logfile.write('A')], ['b', path('b.log'), lambda logfile: logfile.write('B')]])
+            with open(path('b.log')) as f:
+                self.assertEqual('B', f.read())
+            with self.assertRaises(JobsFailedException) as cm:
+                runjobs(2, [['ok', path('ok.log'), lambda logfile: None], ['bad', path('bad.log'), fail]])
+            self.assertEqual((['bad'],), cm.exception.args)
+            with open(path('bad.log')) as f:
+                text = f.read()
+            self.assertTrue(text.startswith('before\n'))
+            self.assertIn('boom', text)
+
+    def test_sizes(self):
+        self.assertEqual(100, parsesize(100))
+        self.assertEqual(1536, parsesize('1.5k'))
+        self.assertEqual(10 * 1024 ** 3, parsesize('10G'))
+        self.assertEqual('100', formatsize(100))
+        self.assertEqual('1.5K', formatsize(1536))
+        self.assertEqual('10.0G', formatsize(10 * 1024 ** 3))
+
+    def test_indexreq(self):
+        self.assertTrue(_indexreq('foo>=1.2'))
+        self.assertTrue(_indexreq('foo[bar]==3; python_version < "3"'))
+        self.assertFalse(_indexreq('/wheelhouse/volatile/foo-x/foo-1-py3-none-any.whl'))
+        self.assertFalse(_indexreq('foo @ git+https://example.com/foo'))
+        self.assertFalse(_indexreq('/workspace/foo'))
@@ -0,0 +1,80 @@
+# Copyright 2013, 2014, 2015, 2016, 2017, 2020, 2022 Andrzej Cichocki
+
+# This file is part of pyven.
+#
+# pyven is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyven is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyven.  If not, see <http://www.gnu.org/licenses/>.
+
+from .watch import debounced, ImportGraph, PollWatcher, watcher, watchtree
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+import os
+
+class TestWatch(TestCase):
+
+    def test_affectedtests(self):
+        with TemporaryDirectory() as root:
+            def write(relpath, text):
+                path = os.path.join(root, relpath)
+                os.makedirs(os.path.dirname(path), exist_ok = True)
+                with open(path, 'w') as f:
+                    f.write(text)
+                return path
+            init = write(os.path.join('pkg', '__init__.py'), '')
+            core = write(os.path.join('pkg', 'core.py'), '')
+            util = write(os.path.join('pkg', 'util.py'), 'from .core import x\n')
+            other = write(os.path.join('pkg', 'other.py'), '')
+            testutil = write(os.path.join('pkg', 'test_util.py'), 'from pkg.util import y\n')
+            testother = write(os.path.join('pkg', 'test_other.py'), 'from . import other\n')
+            pypaths = [init, core, util, other, testutil, testother]
+            graph = ImportGraph(root)
+            self.assertEqual([testutil], graph.affectedtests(pypaths, {core}))
+            self.assertEqual([testother], graph.affectedtests(pypaths, {other}))
+            self.assertEqual([testother, testutil], graph.affectedtests(pypaths, {init}))
+            self.assertEqual([testutil], graph.affectedtests(pypaths, {testutil}))
+
+    def test_watchers(self):
+        with TemporaryDirectory() as root:
+            path = os.path.join(root, 'x.py')
+            for w in watcher(), PollWatcher():
+                w.interval = .01
+                try:
+                    w.watch(root)
+                    with open(path, 'w') as f:
+                        f.write('x')
+                    self.assertEqual({path}, debounced(w, .05))
+                finally:
+                    w.close()
+
+    def test_watchtree(self):
+        with TemporaryDirectory() as root:
+            os.makedirs(os.path.join(root, 'a', '.git'))
+            w = watcher()
+            try:
+                watched = set()
+                watchtree(w, root, watched)
+                self.assertEqual({root, os.path.join(root, 'a')}, watched)
+                os.makedirs(os.path.join(root, 'var', 'x'))
+                watchtree(w, os.path.join(root, 'var'), watched, lambda dirpath: 'var' == os.path.basename(dirpath))
+                self.assertEqual({root, os.path.join(root, 'a')}, watched)
+                debounced(w, .05)
+                newdir = os.path.join(root, 'a', 'new')
+                os.mkdir(newdir)
+                self.assertEqual({newdir}, debounced(w, .05))
+                watchtree(w, newdir, watched)
+                path = os.path.join(newdir, 'test_x.py')
+                with open(path, 'w'):
+                    pass
+                self.assertEqual({path}, debounced(w, .05))
+            finally:
+                w.close()
@@ -0,0 +1,113 @@
+# Copyright 2013, 2014, 2015, 2016, 2017, 2020, 2022 Andrzej Cichocki
+
+# This file is part of pyven.
+#
+# pyven is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyven is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyven.  If not, see <http://www.gnu.org/licenses/>.
+
+from .util import stderr
+from collections import defaultdict
+from contextlib import contextmanager
+from functools import wraps
+import json, os, subprocess, threading, time
+
+tracer = None
+
+class NoSpan:
+
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exc_info):
+        pass
+
+nospan = NoSpan()
+
+class Tracer:
+
+    def __init__(self):
+        self.origin = time.time()
+        self.events = []
+
+    def complete(self, name, start, end, args):
+        self.events.append(dict(name = name, ph = 'X', ts = (start - self.origin) * 1e6, dur = (end - start) * 1e6, pid = os.getpid(), tid = threading.current_thread().ident, args = args))
+
+    @contextmanager
+    def span(self, name, args):
+        start = time.time()
+        try:
+            yield
+        finally:
+            self.complete(name, start, time.time(), args)
+
+    def tracedpopen(self):
+        tracer = self
+        class TracedPopen(subprocess.Popen):
+            def __init__(self, args, *popenargs, **kwargs):
+                self.tracestart = time.time()
+                self.tracecommand = ' '.join(map(str, args)) if isinstance(args, (list, tuple)) else str(args)
+                super(TracedPopen, self).__init__(args, *popenargs, **kwargs)
+            def wait(self, *waitargs, **kwargs):
+                running = self.returncode is None
+                try:
+                    return super(TracedPopen, self).wait(*waitargs, **kwargs)
+                finally:
+                    if running and self.returncode is not None:
+                        tracer.complete('subprocess', self.tracestart, time.time(), dict(command = self.tracecommand, returncode = self.returncode))
+        return TracedPopen
+
+    def summary(self, limit = 20):
+        totals = defaultdict(lambda: [0, 0.0, 0.0])
+        for e in self.events:
+            t = totals[e['name']]
+            t[0] += 1
+            t[1] += e['dur'] / 1e6
+            t[2] = max(t[2], e['dur'] / 1e6)
+        stderr("%-30s %6s %10s %10s" % ('span', 'count', 'total/s', 'max/s'))
+        for name, (count, total, longest) in sorted(totals.items(), key = lambda item: -item[1][1])[:limit]:
+            stderr("%-30s %6s %10.3f %10.3f" % (name, count, total, longest))
+
+def span(name, **args):
+    return nospan if tracer is None else tracer.span(name, args)
+
+def traced(name):
+    def decorator(f):
+        @wraps(f)
+        def g(*args, **kwargs):
+            if tracer is None:
+                return f(*args, **kwargs)
+            with tracer.span(name, {}):
+                return f(*args, **kwargs)
+        return g
+    return decorator
+
+def addtraceoption(parser):
+    parser.add_argument('--trace', metavar = 'PATH', default = '', help = 'write Chrome trace-event JSON to this path')
+
+@contextmanager
+def tracing(path):
+    global tracer
+    if not path:
+        yield
+        return
+    tracer = Tracer()
+    popen = subprocess.Popen
+    subprocess.Popen = tracer.tracedpopen()
+    try:
+        yield
+    finally:
+        subprocess.Popen = popen
+        t, tracer = tracer, None
+        with open(path, 'w') as f:
+            json.dump(dict(traceEvents = t.events), f)
+        t.summary()
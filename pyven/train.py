@@ -0,0 +1,131 @@
+# Copyright 2013, 2014, 2015, 2016, 2017, 2020, 2022 Andrzej Cichocki
+
+# This file is part of pyven.
+#
+# pyven is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyven is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyven.  If not, see <http://www.gnu.org/licenses/>.
+
+from .upload import existingfiles
+from .util import cachedir, ThreadPoolExecutor
+from threading import Lock
+import hashlib, json, logging, os, subprocess, sys, time
+
+log = logging.getLogger(__name__)
+
+class CycleException(Exception): pass
+
+def trainorder(nametodeps):
+    order = []
+    state = {}
+    def visit(name, path):
+        if state.get(name) == 'done':
+            return
+        if state.get(name) == 'visiting':
+            raise CycleException(path + [name])
+        state[name] = 'visiting'
+        for dep in sorted(nametodeps[name]):
+            if dep in nametodeps:
+                visit(dep, path + [name])
+        state[name] = 'done'
+        order.append(name)
+    for name in sorted(nametodeps):
+        visit(name, [])
+    return order
+
+class Progress:
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = Lock()
+        try:
+            with open(path) as f:
+                self.done = json.load(f)
+        except (IOError, ValueError):
+            self.done = {}
+
+    def isdone(self, name, commit):
+        return self.done.get(name) == commit
+
+    def markdone(self, name, commit):
+        with self.lock:
+            self.done[name] = commit
+            os.makedirs(os.path.dirname(self.path), exist_ok = True)
+            with open(self.path + '.part', 'w') as f:
+                json.dump(self.done, f, indent = 2, sort_keys = True)
+            os.replace(self.path + '.part', self.path)
+
+def _headcommit(projectdir):
+    return subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd = projectdir).decode().strip()
+
+class Train:
+
+    pollinterval = 5
+    polltimeout = 900
+
+    def __init__(self, infos, upload, indexurl, jobs):
+        self.nametoinfo = {i.config.name: i for i in infos}
+        self.upload = upload
+        self.indexurl = indexurl
+        self.jobs = jobs
+        key = hashlib.sha1('\n'.join(sorted(os.path.abspath(i.projectdir) for i in infos)).encode()).hexdigest()[:12]
+        self.progress = Progress(os.path.join(cachedir, 'train', "%s.json" % key))
+
+    def _awaitindex(self, name, projectdir):
+        tags = [t for t in subprocess.check_output(['git', 'tag', '--points-at', 'HEAD'], cwd = projectdir).decode().split() if t.startswith('v')]
+        if not tags:
+            return
+        marker = "-%s." % tags[-1][1:]
+        deadline = time.time() + self.polltimeout
+        while not any(marker in n for n in existingfiles(self.indexurl, name)):
+            if time.time() > deadline:
+                raise Exception("Not on index after %ss: %s %s" % (self.polltimeout, name, tags[-1]))
+            log.info("Wait for index: %s %s", name, tags[-1])
+            time.sleep(self.pollinterval)
+
+    def _release(self, name, upstreams):
+        for future in upstreams:
+            future.result() # Propagate upstream failure.
+        info = self.nametoinfo[name]
+        commit = _headcommit(info.projectdir)
+        if self.progress.isdone(name, commit):
+            log.info("Already released: %s", name)
+            return
+        logpath = os.path.join(info.projectdir, 'var', 'train.log')
+        os.makedirs(os.path.dirname(logpath), exist_ok = True)
+        log.info("Release: %s", name)
+        with open(logpath, 'w') as logfile:
+            status = subprocess.call([sys.executable, '-m', 'pyven.release'] + (['--upload'] if self.upload else []) + [info.projectdir], stdout = logfile, stderr = subprocess.STDOUT)
+        if status:
+            raise Exception("Release failed, see %s" % logpath)
+        if self.upload:
+            self._awaitindex(name, info.projectdir)
+            self.progress.markdone(name, commit)
+        log.info("Released: %s", name)
+
+    def run(self):
+        nametodeps = {n: {r.namepart for r in i.parsedrequires()} & set(self.nametoinfo) for n, i in self.nametoinfo.items()}
+        order = trainorder(nametodeps)
+        log.info("Train order: %s", ' '.join(order))
+        futures = {}
+        with ThreadPoolExecutor(self.jobs) as executor: # Submission order means upstreams are always ahead in the queue.
+            for name in order:
+                futures[name] = executor.submit(self._release, name, [futures[d] for d in nametodeps[name]])
+            failed = []
+            for name in order:
+                try:
+                    futures[name].result()
+                except Exception as e:
+                    log.error("%s: %s", name, e)
+                    failed.append(name)
+        if failed:
+            raise Exception("Train incomplete, rerun to resume: %s" % ' '.join(failed))
@@ -18,20 +18,25 @@
 'Check last release can be installed from PyPI and its tests still pass, for use by CI.'
 from .checks import EveryVersion
 from .pipify import pipify
+from .plan import planning
 from .projectinfo import ProjectInfo
-from .util import bgcontainer, initapt, pyversiontags
+from .util import bgcontainer, initapt, pipinstall, runjobs
+from argparse import ArgumentParser
 from lagoon import git
 from lagoon.program import partial
+from subprocess import STDOUT
 from urllib.request import urlopen
 from venvpool import initlogging
-import logging, xml.etree.ElementTree as ET
+import logging, os, xml.etree.ElementTree as ET
 
 log = logging.getLogger(__name__)
 
 def main():
-    from lagoon import docker
     initlogging()
     headinfo = ProjectInfo.seek('.')
+    parser = ArgumentParser()
+    parser.add_argument('--jobs', type = int, default = headinfo.config.tryinstall.jobs)
+    args = parser.parse_args()
     if not headinfo.config.pypi.participant: # XXX: Or look for tags?
         log.info('Not user-installable.')
         return
@@ -41,19 +46,23 @@ def main():
         version = ET.parse(f).find('./channel/item/title').text
     req = "%s==%s" % (project, version)
     upstream_devel_packages = list(headinfo.config.upstream.devel.packages)
-    for pyversion in reversed(pyversiontags[3]): # XXX: Why only 3?
-        log.info("Python version: %s", pyversion)
-        with bgcontainer("python:%s" % pyversion) as container:
-            containerexec = docker[partial]('exec', container, stdout = None)
+    def smoketest(pyversion, logfile):
+        from lagoon import docker
+        with bgcontainer("python:%s" % pyversion, shared = True) as container:
+            containerexec = docker[partial]('exec', container, stdout = logfile, stderr = STDOUT)
             if upstream_devel_packages:
                 initapt(containerexec)
                 containerexec('apt-get', 'update')
                 containerexec('apt-get', 'install', '-y', *upstream_devel_packages)
-            containerexec('pip', 'install', req)
+            pipinstall(container, [req], stdout = logfile, stderr = STDOUT)
+    logsdir = os.path.join(headinfo.projectdir, 'var', 'tryinstall')
+    runjobs(args.jobs, [[pyversion, os.path.join(logsdir, "%s.log" % pyversion), lambda logfile, pyversion = pyversion: smoketest(pyversion, logfile)] for pyversion in map(str, headinfo.config.tryinstall.pythons)])
     git.checkout("v%s" % version, stdout = None)
     info = ProjectInfo.seek('.')
     pipify(info)
-    EveryVersion(info, False, False, [], False, True).nose()
+    everyversion = EveryVersion(info, False, False, [], False, True)
+    with planning(everyversion.historypath(), [u for u in everyversion.units(jobs = args.jobs) if u.name.startswith('nose[')]):
+        everyversion.nose(args.jobs)
 
 if '__main__' == __name__:
     main()
@@ -0,0 +1,103 @@
+# Copyright 2013, 2014, 2015, 2016, 2017, 2020, 2022 Andrzej Cichocki
+
+# This file is part of pyven.
+#
+# pyven is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyven is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyven.  If not, see <http://www.gnu.org/licenses/>.
+
+from .util import formatsize, ThreadPoolExecutor
+from html.parser import HTMLParser
+from urllib.error import HTTPError
+from urllib.request import urlopen
+import logging, os, re, time
+
+log = logging.getLogger(__name__)
+
+class UploadFailedException(Exception): pass
+
+class _Anchors(HTMLParser):
+
+    def __init__(self):
+        HTMLParser.__init__(self)
+        self.names = set()
+        self.inanchor = False
+
+    def handle_starttag(self, tag, attrs):
+        if 'a' == tag:
+            self.inanchor = True
+            href = dict(attrs).get('href')
+            if href:
+                self.names.add(href.split('#')[0].rstrip('/').rsplit('/', 1)[-1])
+
+    def handle_endtag(self, tag):
+        if 'a' == tag:
+            self.inanchor = False
+
+    def handle_data(self, data):
+        if self.inanchor:
+            self.names.add(data.strip())
+
+def existingfiles(indexurl, projectname):
+    url = "%s/%s/" % (indexurl.rstrip('/'), re.sub('[-_.]+', '-', projectname).lower())
+    try:
+        with urlopen(url) as f:
+            text = f.read().decode()
+    except HTTPError as e:
+        if 404 != e.code:
+            raise
+        return set()
+    parser = _Anchors()
+    parser.feed(text)
+    return parser.names
+
+class Uploader:
+
+    def __init__(self, uploadfile, jobs, retries, backoff):
+        self.uploadfile = uploadfile
+        self.jobs = jobs
+        self.retries = retries
+        self.backoff = backoff
+
+    def _upload(self, path):
+        for attempt in range(self.retries + 1):
+            try:
+                self.uploadfile(path)
+                return os.path.getsize(path)
+            except Exception:
+                if attempt == self.retries:
+                    raise
+                delay = self.backoff * 2 ** attempt
+                log.warning("Upload failed, retry in %ss: %s", delay, path, exc_info = True)
+                time.sleep(delay)
+
+    def uploadall(self, paths, existing):
+        todo = []
+        for path in paths:
+            if os.path.basename(path) in existing:
+                log.info("Already on index: %s", path)
+            else:
+                todo.append(path)
+        start = time.time()
+        failed = []
+        total = 0
+        with ThreadPoolExecutor(self.jobs) as executor:
+            for path, future in [[p, executor.submit(self._upload, p)] for p in todo]:
+                try:
+                    total += future.result()
+                except Exception:
+                    log.exception("Upload failed: %s", path)
+                    failed.append(path)
+        seconds = time.time() - start
+        log.info("Uploaded %s files, %s in %.1fs (%s/s)", len(todo) - len(failed), formatsize(total), seconds, formatsize(int(total / seconds)) if seconds else '-')
+        if failed:
+            raise UploadFailedException(failed)
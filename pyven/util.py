@@ -16,9 +16,14 @@
 # along with pyven.  If not, see <http://www.gnu.org/licenses/>.
 
 from contextlib import contextmanager
-import os, re, sys
+import os, re, sys, traceback
 
 pyversiontags = {2: ['2'], 3: ['3.6', '3.7', '3.8', '3.9']}
+cachedir = os.path.join(os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache'), 'pyven')
+wheelhouse = os.path.join(cachedir, 'wheelhouse')
+pipcache = os.path.join(cachedir, 'pip')
+containerwheelhouse = '/wheelhouse'
+containerpipcache = '/pipcache'
 
 def stderr(obj):
     sys.stderr.write(str(obj))
@@ -28,27 +33,84 @@ def stripeol(line):
     line, = line.splitlines()
     return line
 
+sizeunits = 'KMGT'
+
+def parsesize(text):
+    text = str(text).strip().upper()
+    if text[-1:] in sizeunits:
+        return int(float(text[:-1]) * 1024 ** (1 + sizeunits.index(text[-1])))
+    return int(text)
+
+def formatsize(n):
+    unit = ''
+    for u in sizeunits:
+        if n < 1024:
+            break
+        n /= 1024
+        unit = u
+    return "%.1f%s" % (n, unit) if unit else str(n)
+
 class Excludes:
 
+    everything = object()
+
     def __init__(self, globs):
-        def disjunction():
-            sep = re.escape(os.sep)
-            star = "[^%s]*" % sep
-            def components():
-                for word in glob.split('/'):
-                    if '**' == word:
-                        yield "(?:%s%s)*" % (star, sep)
-                    else:
-                        yield star.join(re.escape(part) for part in word.split('*'))
-                        yield sep
-            for glob in globs:
-                concat = ''.join(components())
-                assert concat.endswith(sep)
-                yield concat[:-len(sep)]
-        self.pattern = re.compile("^%s$" % '|'.join(disjunction()))
+        def tokens(glob):
+            words = glob.split('/')
+            for i, word in enumerate(words):
+                if '**' == word:
+                    yield self.everything if len(words) - 1 == i else None
+                else:
+                    yield re.compile('.*'.join(re.escape(part) for part in word.split('*')) + r'\Z', re.DOTALL).match
+        self.globs = [list(tokens(glob)) for glob in globs]
+        self.dirstates = {'': self._closure((g, 0) for g in range(len(self.globs)))}
+
+    def _closure(self, states):
+        closed = set()
+        for g, i in states:
+            while True:
+                closed.add((g, i))
+                if i == len(self.globs[g]) or self.globs[g][i] is not None:
+                    break
+                i += 1
+        return frozenset(closed)
+
+    def _step(self, states, segment):
+        def targets():
+            for g, i in states:
+                tokens = self.globs[g]
+                if i < len(tokens):
+                    token = tokens[i]
+                    if token is None:
+                        yield g, i
+                    elif token is self.everything:
+                        yield g, i
+                        yield g, i + 1
+                    elif token(segment) is not None:
+                        yield g, i + 1
+        return self._closure(targets())
+
+    def _dirstate(self, prefix):
+        try:
+            return self.dirstates[prefix]
+        except KeyError:
+            parent, sep, segment = prefix[:-len(os.sep)].rpartition(os.sep)
+            self.dirstates[prefix] = states = self._step(self._dirstate(parent + sep), segment)
+            return states
+
+    def _prefix(self, dirrelpath):
+        return dirrelpath + os.sep if dirrelpath else ''
+
+    def mayexclude(self, dirrelpath):
+        return bool(self._dirstate(self._prefix(dirrelpath)))
+
+    def excludesall(self, dirrelpath): # Whole subtree can be pruned.
+        return any(i < len(self.globs[g]) and self.globs[g][i] is self.everything for g, i in self._dirstate(self._prefix(dirrelpath)))
 
     def __contains__(self, relpath):
-        return self.pattern.search(relpath) is not None
+        prefix, sep, name = relpath.rpartition(os.sep)
+        states = self._dirstate(prefix + sep)
+        return bool(states) and any(len(self.globs[g]) == i for g, i in self._step(states, name))
 
 class Path(str):
 
@@ -66,6 +128,9 @@ class Path(str):
 
 class ThreadPoolExecutor:
 
+    def __init__(self, *args, **kwargs):
+        pass
+
     def __enter__(self):
         return self
 
@@ -84,15 +149,61 @@ try:
 except ImportError:
     pass
 
+class JobsFailedException(Exception): pass
+
+def runjobs(jobs, tasks):
+    def run(logpath, f):
+        os.makedirs(os.path.dirname(logpath), exist_ok = True)
+        with open(logpath, 'w') as logfile:
+            try:
+                f(logfile)
+            except Exception:
+                logfile.write(traceback.format_exc())
+                return False
+        return True
+    with ThreadPoolExecutor(jobs) as executor:
+        futures = [[label, logpath, executor.submit(run, logpath, f)] for label, logpath, f in tasks]
+        failed = []
+        for label, logpath, future in futures:
+            ok = future.result()
+            stderr("%s: %s %s" % (label, 'OK' if ok else 'FAIL', logpath))
+            if not ok:
+                failed.append(label)
+    if failed:
+        raise JobsFailedException(failed)
+
 @contextmanager
-def bgcontainer(*dockerrunargs):
+def bgcontainer(*dockerrunargs, shared = False):
+    from .trace import span
     from lagoon import docker
     from lagoon.program import NOEOL
-    container = docker.run._d[NOEOL](*dockerrunargs + ('sleep', 'inf'))
-    try:
-        yield container
-    finally:
-        docker.rm._f(container, stdout = None)
+    sharedargs = ()
+    if shared:
+        for path in wheelhouse, pipcache:
+            os.makedirs(path, exist_ok = True)
+        sharedargs = (
+            '-v', "%s:%s" % (wheelhouse, containerwheelhouse),
+            '-v', "%s:%s" % (pipcache, containerpipcache),
+            '-e', "PIP_CACHE_DIR=%s" % containerpipcache,
+            '-e', "PIP_FIND_LINKS=%s" % containerwheelhouse,
+        )
+    with span('bgcontainer', image = dockerrunargs[-1]):
+        container = docker.run._d[NOEOL](*sharedargs + dockerrunargs + ('sleep', 'inf'))
+        try:
+            yield container
+        finally:
+            docker.rm._f(container, stdout = None)
+
+def _indexreq(req):
+    return not (os.sep in req or req.endswith('.whl') or '://' in req or '@' in req)
+
+def pipinstall(container, reqs, execargs = (), stdout = None, stderr = None):
+    from lagoon import docker
+    indexreqs = tuple(r for r in reqs if _indexreq(r)) # Local and volatile builds must not shadow index releases in find-links.
+    if indexreqs:
+        # Build as host user so the shared dirs stay ours, later containers find the wheels via PIP_FIND_LINKS:
+        docker('exec', '-u', "%s:%s" % (os.geteuid(), os.getegid()), *execargs + (container, 'pip', 'wheel', '-w', containerwheelhouse) + indexreqs, stdout = stdout, stderr = stderr)
+    docker('exec', *execargs + (container, 'pip', 'install', '--no-cache-dir') + tuple(reqs), stdout = stdout, stderr = stderr)
 
 def initapt(dockerexec):
     dockerexec('mkdir', '-pv', '/etc/apt/keyrings')
@@ -0,0 +1,115 @@
+# Copyright 2013, 2014, 2015, 2016, 2017, 2020, 2022 Andrzej Cichocki
+
+# This file is part of pyven.
+#
+# pyven is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyven is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyven.  If not, see <http://www.gnu.org/licenses/>.
+
+'List pool venvs with size, last use and requirements fingerprint, and evict least recently used to stay within quota.'
+from .clone import templatesdir
+from .projectinfo import ProjectInfo
+from .util import cachedir, formatsize, parsesize
+from argparse import ArgumentParser
+from datetime import datetime
+from itertools import chain
+from venvpool import initlogging, listorempty, pooldir, Venv
+import hashlib, logging, os, re
+
+log = logging.getLogger(__name__)
+evictedpath = os.path.join(cachedir, 'venvs.evicted')
+distinfo = re.compile(r'[.](?:dist|egg)-info\Z')
+
+class VenvInfo:
+
+    def __init__(self, pyversion, venv):
+        self.pyversion = pyversion
+        self.venv = venv
+        inodes = set()
+        size = 0
+        for dirpath, dirnames, filenames in os.walk(venv.venvpath):
+            for name in filenames + dirnames:
+                try:
+                    st = os.lstat(os.path.join(dirpath, name))
+                except FileNotFoundError: # Concurrent transient churn.
+                    continue
+                key = st.st_dev, st.st_ino
+                if key not in inodes:
+                    inodes.add(key)
+                    size += st.st_size
+        self.size = size
+        self.lastuse = max(os.stat(p).st_mtime for p in [venv.venvpath, venv.readlocks] if os.path.exists(p)) # Lock files come and go in readlocks.
+        try:
+            dists = sorted(n.lower() for n in os.listdir(venv.site_packages) if distinfo.search(n) is not None)
+        except (OSError, ValueError):
+            dists = []
+        self.fingerprint = hashlib.sha256('\n'.join(dists).encode()).hexdigest()[:12]
+        self.distcount = len(dists)
+
+    def __str__(self):
+        return "%s %8s %s %s/%-3s %s" % (self.pyversion, formatsize(self.size), datetime.fromtimestamp(self.lastuse).strftime('%Y-%m-%d %H:%M'), self.fingerprint, self.distcount, self.venv.venvpath)
+
+def inventory():
+    pooled = ((versiondir, venv) for versiondir in listorempty(pooldir) for venv in listorempty(versiondir, Venv))
+    templates = ((versiondir, venv) for versiondir in listorempty(templatesdir) for reqsdir in listorempty(versiondir) for venv in listorempty(reqsdir, Venv))
+    return sorted((VenvInfo(os.path.basename(versiondir), venv) for versiondir, venv in chain(pooled, templates)), key = lambda i: i.lastuse)
+
+def evict(quota, infos = None):
+    if infos is None:
+        infos = inventory()
+    total = sum(i.size for i in infos)
+    for i in infos:
+        if total <= quota:
+            break
+        if i.venv.trywritelock():
+            i.venv.delete('evicted')
+            total -= i.size
+        else:
+            log.debug("Busy: %s", i.venv.venvpath)
+    if total > quota:
+        log.warning("Still over quota: %s > %s", formatsize(total), formatsize(quota))
+    return total
+
+def _versiondirs():
+    return listorempty(pooldir) + [reqsdir for versiondir in listorempty(templatesdir) for reqsdir in listorempty(versiondir)]
+
+def evictifgrown(quota):
+    try:
+        stamp = os.stat(evictedpath).st_mtime
+    except FileNotFoundError:
+        stamp = None
+    if stamp is not None and all(os.stat(d).st_mtime <= stamp for d in _versiondirs()): # No venv created since last time.
+        return
+    evict(quota)
+    os.makedirs(os.path.dirname(evictedpath), exist_ok = True)
+    with open(evictedpath, 'w'):
+        pass
+
+def configquota(info):
+    return parsesize(info.config.venvs.quota)
+
+def main():
+    initlogging()
+    parser = ArgumentParser()
+    parser.add_argument('--evict', action = 'store_true', help = 'delete least recently used venvs until within quota')
+    parser.add_argument('--quota', help = 'disk quota for all pool venvs e.g. 10G, default from project config')
+    args = parser.parse_args()
+    infos = inventory()
+    for i in infos:
+        print(i)
+    print("Total: %s in %s venvs" % (formatsize(sum(i.size for i in infos)), len(infos)))
+    if args.evict:
+        quota = configquota(ProjectInfo.seekany('.')) if args.quota is None else parsesize(args.quota)
+        print("After eviction: %s of %s quota" % (formatsize(evict(quota, infos)), formatsize(quota)))
+
+if '__main__' == __name__:
+    main()
@@ -0,0 +1,176 @@
+# Copyright 2013, 2014, 2015, 2016, 2017, 2020, 2022 Andrzej Cichocki
+
+# This file is part of pyven.
+#
+# pyven is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyven is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyven.  If not, see <http://www.gnu.org/licenses/>.
+
+from collections import defaultdict
+import ast, ctypes, errno, os, select, struct, sys, time
+
+vcsdirs = {'.git', '.hg'}
+
+class Inotify:
+
+    mask = 0x8 | 0x40 | 0x80 | 0x100 | 0x200 # IN_CLOSE_WRITE, IN_MOVED_FROM, IN_MOVED_TO, IN_CREATE, IN_DELETE.
+    header = struct.Struct('iIII')
+
+    def __init__(self):
+        self.libc = ctypes.CDLL(None, use_errno = True)
+        self.fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1')
+        self.wdtodir = {}
+
+    def watch(self, dirpath):
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(dirpath), self.mask)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_add_watch', dirpath)
+        self.wdtodir[wd] = dirpath
+
+    def changes(self, timeout):
+        paths = set()
+        if select.select([self.fd], [], [], timeout)[0]:
+            while True:
+                try:
+                    data = os.read(self.fd, 64 * 1024)
+                except OSError as e:
+                    if errno.EAGAIN != e.errno:
+                        raise
+                    break
+                i = 0
+                while i < len(data):
+                    wd, _, _, n = self.header.unpack_from(data, i)
+                    i += self.header.size
+                    name = os.fsdecode(data[i:i + n].rstrip(b'\0'))
+                    i += n
+                    if name and wd in self.wdtodir:
+                        paths.add(os.path.join(self.wdtodir[wd], name))
+        return paths
+
+    def close(self):
+        os.close(self.fd)
+
+class PollWatcher:
+
+    interval = 1
+
+    def __init__(self):
+        self.dirs = {}
+
+    def _scan(self, dirpath):
+        mtimes = {}
+        for name in os.listdir(dirpath):
+            path = os.path.join(dirpath, name)
+            try:
+                mtimes[path] = os.stat(path).st_mtime_ns
+            except OSError:
+                pass
+        return mtimes
+
+    def watch(self, dirpath):
+        self.dirs[dirpath] = self._scan(dirpath)
+
+    def changes(self, timeout):
+        time.sleep(self.interval if timeout is None else timeout)
+        paths = set()
+        for dirpath, old in self.dirs.items():
+            new = self._scan(dirpath) if os.path.isdir(dirpath) else {}
+            paths.update(p for p in set(old) | set(new) if old.get(p) != new.get(p))
+            self.dirs[dirpath] = new
+        return paths
+
+    def close(self):
+        pass
+
+def watcher():
+    if sys.platform.startswith('linux'):
+        try:
+            return Inotify()
+        except (AttributeError, OSError):
+            pass
+    return PollWatcher()
+
+def watchtree(watcher, root, watched, excluded = lambda dirpath: False):
+    if excluded(root):
+        return
+    for dirpath, dirnames, _ in os.walk(root):
+        dirnames[:] = [n for n in dirnames if n not in vcsdirs and not excluded(os.path.join(dirpath, n))]
+        if dirpath not in watched:
+            watcher.watch(dirpath)
+            watched.add(dirpath)
+
+def debounced(watcher, quiet):
+    changed = set()
+    while not changed:
+        changed.update(watcher.changes(None))
+    while True:
+        more = watcher.changes(quiet)
+        if not more:
+            return changed
+        changed.update(more)
+
+class ImportGraph:
+
+    def __init__(self, root):
+        self.root = root
+        self.cache = {}
+
+    def _modulename(self, path):
+        words = os.path.relpath(path, self.root)[:-len('.py')].split(os.sep)
+        return '.'.join(words[:-1] if '__init__' == words[-1] else words)
+
+    def _imports(self, path):
+        mtime = os.stat(path).st_mtime_ns
+        cached = self.cache.get(path)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        names = set()
+        try:
+            with open(path, 'rb') as f:
+                tree = ast.parse(f.read(), path)
+        except (SyntaxError, ValueError):
+            tree = None
+        if tree is not None:
+            package = self._modulename(path).split('.')
+            if not path.endswith(os.sep + '__init__.py'):
+                package = package[:-1]
+            for node in ast.walk(tree):
+                if isinstance(node, ast.Import):
+                    names.update(a.name for a in node.names)
+                elif isinstance(node, ast.ImportFrom):
+                    base = '.'.join(([] if not node.level else package[:len(package) - node.level + 1]) + ([node.module] if node.module else []))
+                    names.add(base)
+                    names.update("%s.%s" % (base, a.name) if base else a.name for a in node.names)
+        for name in list(names):
+            while '.' in name:
+                name = name.rsplit('.', 1)[0]
+                names.add(name)
+        self.cache[path] = mtime, names
+        return names
+
+    def affectedtests(self, pypaths, changedpaths):
+        nametopath = {self._modulename(p): p for p in pypaths}
+        importers = defaultdict(set)
+        for path in pypaths:
+            for name in self._imports(path):
+                if name in nametopath:
+                    importers[nametopath[name]].add(path)
+        affected = set()
+        todo = [p for p in changedpaths if p.endswith('.py')]
+        while todo:
+            path = todo.pop()
+            if path not in affected:
+                affected.add(path)
+                todo.extend(importers[path])
+        return sorted(p for p in affected if os.path.basename(p).startswith('test_'))